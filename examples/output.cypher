@@ -1,36 +1,38 @@
 // LOAD_CSV: level1.csv AS measurement
 LOAD CSV WITH HEADERS FROM "file:///level1.csv" AS row
-WITH row
-MERGE (f:factory { id: row.factory })
-CREATE (m:measurement {
-  factory_id: row.factory,
-  product_id: row.product,
-  fuel: row.type,
-  value: toFloat(row.value),
-  unit: row.unit,
-  time: row.time
-})
-MERGE (m)-[:AT_FACTORY]->(f);
+CALL {
+  WITH row
+  MERGE (f:factory { id: row.factory })
+  CREATE (m:measurement {
+    factory_id: row.factory,
+    product_id: row.product,
+    fuel: row.type,
+    value: toFloat(row.value),
+    unit: row.unit,
+    time: row.time
+  })
+  MERGE (m)-[:AT_FACTORY]->(f)
+} IN TRANSACTIONS OF 10000 ROWS;
 
 // LOAD_CSV: emission_factors.csv AS emission_factor_table
 LOAD CSV WITH HEADERS FROM "file:///emission_factors.csv" AS row
-WITH row
-CREATE (m:emission_factor_table {
-  fuel: row.fuel,
-  factor: toFloat(row.factor),
-  factor_unit: row.factor_unit,
-  scope: row.scope
-})
-;
+CALL {
+  WITH row
+  CREATE (m:emission_factor_table {
+    fuel: row.fuel,
+    factor: toFloat(row.factor),
+    factor_unit: row.factor_unit,
+    scope: row.scope
+  })
+} IN TRANSACTIONS OF 10000 ROWS;
 
 // NORMALIZE: measurement
 MATCH (n:measurement)
-WHERE n.fuel = 'gass'
-SET n.fuel = 'gas';
-
-MATCH (n:measurement)
-WHERE n.fuel = 'electricty'
-SET n.fuel = 'electricity';
+WHERE n.fuel IN ['gass', 'electricty']
+SET n.fuel = CASE n.fuel
+  WHEN 'gass' THEN 'gas'
+  WHEN 'electricty' THEN 'electricity'
+END;
 
 // AGGREGATE: measurement -> activity
 MATCH (m:measurement)
@@ -41,6 +43,7 @@ WITH
   SUM(m.value) AS value,
   COLLECT(m.unit)[0] AS unit,
   COLLECT(m.fuel)[0] AS fuel
+MERGE (f:factory { id: factory_id })
 CREATE (a:activity {
   factory_id: factory_id,
   product_id: product_id,
@@ -49,8 +52,6 @@ CREATE (a:activity {
   fuel: fuel,
   time_window: time_window
 })
-WITH a
-MATCH (f:factory { id: a.factory_id })
 MERGE (a)-[:AT_FACTORY]->(f);
 
 // ENRICH: activity WITH emission_factor_table
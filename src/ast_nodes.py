@@ -3,37 +3,57 @@ AST (Abstract Syntax Tree) node definitions for the Dynamic Ontology DSL.
 
 This module defines the data structures representing the parsed DSL statements.
 Each class corresponds to a specific DSL statement type.
+
+All nodes use __slots__ to keep large ASTs compact. All nodes except
+Program are immutable (frozen), with tuples for their sequences, so parsed
+statements can be shared safely, and identical expressions compare and
+hash equal. Labels and property names recur throughout a program, so
+statements intern them: duplicates share one string and compare by identity.
 """
 
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union, Any
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Expression:
     """Base class for expressions in the DSL."""
     pass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class IdentifierExpr(Expression):
     """Identifier expression (e.g., variable name)."""
     name: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NumberExpr(Expression):
     """Numeric literal expression."""
-    value: float
+    value: Union[int, float]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StringExpr(Expression):
     """String literal expression."""
     value: str
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def mk_ident(name: str) -> IdentifierExpr:
+    """Return the shared IdentifierExpr instance for a name."""
+    return IdentifierExpr(name)
+
+
+@lru_cache(maxsize=None)
+def mk_string(value: str) -> StringExpr:
+    """Return the shared StringExpr instance for a literal value."""
+    return StringExpr(value)
+
+
+@dataclass(slots=True, frozen=True)
 class BinaryOpExpr(Expression):
     """Binary operation (e.g., a + b, a * b)."""
     left: Expression
@@ -41,26 +61,37 @@ class BinaryOpExpr(Expression):
     right: Expression
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FunctionCallExpr(Expression):
     """Function call expression (e.g., sum(value))."""
     function_name: str
     argument: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ConcatenationExpr(Expression):
     """String concatenation expression."""
-    parts: List[Expression]
+    parts: Tuple[Expression, ...]
+
+
+def _intern_pairs(pairs: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[str, str], ...]:
+    """Intern both strings of each pair."""
+    return tuple((sys.intern(a), sys.intern(b)) for a, b in pairs)
+
+
+def _set_fields(node: Any, **values: Any) -> None:
+    """Assign fields of a frozen node; for use in __post_init__ only."""
+    for name, value in values.items():
+        object.__setattr__(node, name, value)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Statement:
     """Base class for all DSL statements."""
     pass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LoadStatement(Statement):
     """
     LOAD_CSV statement for loading CSV data into graph nodes.
@@ -71,10 +102,20 @@ class LoadStatement(Statement):
     """
     path: str
     node_label: str
-    column_map: Dict[str, str] = field(default_factory=dict)
+    column_map: Tuple[Tuple[str, str], ...] = ()  # (csv_column, property) pairs in source order
+    has_factory: bool = field(init=False)  # Maps a factory column, so rows link to factory nodes
 
+    def __post_init__(self) -> None:
+        column_map = _intern_pairs(self.column_map)
+        _set_fields(
+            self,
+            node_label=sys.intern(self.node_label),
+            column_map=column_map,
+            has_factory=any(src == 'factory' or dst == 'factory_id' for src, dst in column_map),
+        )
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class NormalizeStatement(Statement):
     """
     NORMALIZE statement for data normalization (e.g., fixing typos).
@@ -85,18 +126,33 @@ class NormalizeStatement(Statement):
         }
     """
     node_label: str
-    normalizations: Dict[str, Dict[str, str]]  # property -> {old_value: new_value}
+    normalizations: Tuple[Tuple[str, Tuple[Tuple[str, str], ...]], ...]  # (property, ((old_value, new_value), ...))
+
+    def __post_init__(self) -> None:
+        _set_fields(
+            self,
+            node_label=sys.intern(self.node_label),
+            normalizations=tuple((sys.intern(prop), tuple(mappings)) for prop, mappings in self.normalizations),
+        )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AggregationClause:
     """Aggregation function specification."""
     function: str  # 'sum', 'count', 'first', 'avg'
     field: Optional[str]  # field to aggregate (None for COUNT)
     alias: str  # output field name
 
+    def __post_init__(self) -> None:
+        _set_fields(
+            self,
+            function=sys.intern(self.function),
+            field=sys.intern(self.field) if self.field is not None else None,
+            alias=sys.intern(self.alias),
+        )
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class TimeWindow:
     """Time window specification for aggregation."""
     mode: str  # 'daily', 'monthly', 'yearly'
@@ -104,7 +160,7 @@ class TimeWindow:
     target_field: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AggregateStatement(Statement):
     """
     AGGREGATE statement for grouping and aggregating data.
@@ -118,13 +174,25 @@ class AggregateStatement(Statement):
           TIME_WINDOW monthly FROM time INTO time_window
     """
     source_label: str
-    group_by: List[str]
+    group_by: Tuple[str, ...]
     target_label: str
-    aggregations: List[AggregationClause]
+    aggregations: Tuple[AggregationClause, ...]
     time_window: Optional[TimeWindow] = None
+    groups_by_factory: bool = field(init=False)  # Groups by factory_id, so results link to factory nodes
+
+    def __post_init__(self) -> None:
+        group_by = tuple(sys.intern(name) for name in self.group_by)
+        _set_fields(
+            self,
+            source_label=sys.intern(self.source_label),
+            group_by=group_by,
+            target_label=sys.intern(self.target_label),
+            aggregations=tuple(self.aggregations),
+            groups_by_factory='factory_id' in group_by,
+        )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class UnitConvertStatement(Statement):
     """
     UNIT_CONVERT statement for unit conversion.
@@ -138,8 +206,11 @@ class UnitConvertStatement(Statement):
     to_unit: str
     conversion_table: str
 
+    def __post_init__(self) -> None:
+        _set_fields(self, node_label=sys.intern(self.node_label), field=sys.intern(self.field))
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class EnrichStatement(Statement):
     """
     ENRICH statement for enriching nodes with external data.
@@ -156,10 +227,19 @@ class EnrichStatement(Statement):
     factor_table: str
     match_key: str
     target_label: str
-    output_fields: Dict[str, Expression]
+    output_fields: Tuple[Tuple[str, Expression], ...]  # (field, expression) pairs in source order
+
+    def __post_init__(self) -> None:
+        _set_fields(
+            self,
+            source_label=sys.intern(self.source_label),
+            match_key=sys.intern(self.match_key),
+            target_label=sys.intern(self.target_label),
+            output_fields=tuple((sys.intern(name), expr) for name, expr in self.output_fields),
+        )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ComputeStatement(Statement):
     """
     COMPUTE statement for calculating aggregate values.
@@ -173,12 +253,21 @@ class ComputeStatement(Statement):
     """
     field_name: str
     source_label: str
-    group_by: List[str]
+    group_by: Tuple[str, ...]
     target_label: str
     expression: Expression
 
+    def __post_init__(self) -> None:
+        _set_fields(
+            self,
+            field_name=sys.intern(self.field_name),
+            source_label=sys.intern(self.source_label),
+            group_by=tuple(sys.intern(name) for name in self.group_by),
+            target_label=sys.intern(self.target_label),
+        )
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class ValidateStatement(Statement):
     """
     VALIDATE statement for data validation.
@@ -189,8 +278,11 @@ class ValidateStatement(Statement):
     node_label: str
     rule_name: str
 
+    def __post_init__(self) -> None:
+        _set_fields(self, node_label=sys.intern(self.node_label))
+
 
-@dataclass
+@dataclass(slots=True)
 class Program:
     """Root node representing the entire DSL program."""
     statements: List[Statement]
@@ -0,0 +1,155 @@
+"""
+AST optimization passes for the Dynamic Ontology DSL.
+
+This module rewrites a parsed Program before code generation:
+numeric constant subexpressions are folded, and structurally identical
+expressions are hash-consed so that each distinct subtree exists once.
+The code generator memoizes rendered expressions by node identity, so
+shared subtrees are only rendered once.
+"""
+
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ast_nodes import (
+    Program, Statement, Expression,
+    EnrichStatement, ComputeStatement,
+    IdentifierExpr, NumberExpr, StringExpr, BinaryOpExpr, FunctionCallExpr, ConcatenationExpr
+)
+
+# Cypher integers are 64-bit; results outside this range are left unfolded
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+
+def _fold(operator: str, left: Union[int, float], right: Union[int, float]) -> Optional[Union[int, float]]:
+    """
+    Evaluate a binary operation on two numeric literals with Cypher semantics.
+
+    Returns:
+        The folded value, or None if the operation should be left to Neo4j
+        (division by zero, inexact integer division, overflow, inf/nan)
+    """
+    result: Union[int, float]
+    if operator == '+':
+        result = left + right
+    elif operator == '-':
+        result = left - right
+    elif operator == '*':
+        result = left * right
+    elif operator == '/':
+        if right == 0:
+            return None
+        if isinstance(left, int) and isinstance(right, int):
+            # Cypher truncates integer division; only fold exact quotients
+            if left % right:
+                return None
+            result = left // right
+        else:
+            result = left / right
+    else:
+        return None
+
+    if isinstance(result, int):
+        if not _INT_MIN <= result <= _INT_MAX:
+            return None
+    elif result != result or result in (float('inf'), float('-inf')):
+        return None
+    return result
+
+
+class _Canonicalizer:
+    """Folds constants and hash-conses expressions through a shared table."""
+
+    def __init__(self) -> None:
+        self.table: Dict[Tuple[Any, ...], Expression] = {}
+
+    def intern(self, key: Tuple[Any, ...], expr: Expression) -> Expression:
+        """Return the canonical node for key, registering expr if it is new."""
+        return self.table.setdefault(key, expr)
+
+    def expression(self, expr: Expression) -> Expression:
+        """Return the canonical (folded, shared) version of an expression."""
+        # Iterative postorder walk, mirroring CypherGenerator._render_expression
+        results: List[Expression] = []
+        stack = [(expr, False)]
+
+        while stack:
+            node, expanded = stack.pop()
+
+            if isinstance(node, BinaryOpExpr):
+                if not expanded:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right = results.pop()
+                left = results.pop()
+                results.append(self.binary_op(node, left, right))
+
+            elif isinstance(node, ConcatenationExpr):
+                if not expanded:
+                    stack.append((node, True))
+                    stack.extend((part, False) for part in reversed(node.parts))
+                    continue
+                start = len(results) - len(node.parts)
+                parts = tuple(results[start:])
+                del results[start:]
+                if any(new is not old for new, old in zip(parts, node.parts)):
+                    node = ConcatenationExpr(parts)
+                results.append(self.intern((ConcatenationExpr,) + tuple(id(part) for part in parts), node))
+
+            else:
+                results.append(self.leaf(node))
+
+        return results[0]
+
+    def binary_op(self, expr: BinaryOpExpr, left: Expression, right: Expression) -> Expression:
+        """Fold or intern a binary operation whose operands are already canonical."""
+        if isinstance(left, NumberExpr) and isinstance(right, NumberExpr):
+            value = _fold(expr.operator, left.value, right.value)
+            if value is not None:
+                return self.leaf(NumberExpr(value))
+        if left is not expr.left or right is not expr.right:
+            expr = BinaryOpExpr(left, expr.operator, right)
+        return self.intern((BinaryOpExpr, expr.operator, id(left), id(right)), expr)
+
+    def leaf(self, expr: Expression) -> Expression:
+        """Intern an expression without sub-expressions."""
+        if isinstance(expr, IdentifierExpr):
+            return self.intern((IdentifierExpr, expr.name), expr)
+
+        elif isinstance(expr, StringExpr):
+            return self.intern((StringExpr, expr.value), expr)
+
+        elif isinstance(expr, NumberExpr):
+            # 1 and 1.0 hash alike but render differently, so key on the type too
+            return self.intern((NumberExpr, type(expr.value), expr.value), expr)
+
+        elif isinstance(expr, FunctionCallExpr):
+            return self.intern((FunctionCallExpr, expr.function_name, expr.argument), expr)
+
+        return expr
+
+    def statement(self, stmt: Statement) -> Statement:
+        """Return stmt with its expressions canonicalized."""
+        if isinstance(stmt, EnrichStatement):
+            output_fields = tuple((name, self.expression(expr)) for name, expr in stmt.output_fields)
+            return replace(stmt, output_fields=output_fields)
+        elif isinstance(stmt, ComputeStatement):
+            return replace(stmt, expression=self.expression(stmt.expression))
+        return stmt
+
+
+def canonicalize(program: Program) -> Program:
+    """
+    Fold numeric constants and deduplicate identical expressions.
+
+    Args:
+        program: Parsed program
+
+    Returns:
+        A new Program; statements without expressions are shared with the input
+    """
+    canon = _Canonicalizer()
+    return Program([canon.statement(stmt) for stmt in program.statements])
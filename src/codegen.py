@@ -4,50 +4,228 @@ Cypher code generator for the Dynamic Ontology DSL.
 This module converts AST nodes into Cypher queries for Neo4j.
 """
 
-from typing import List
+import io
+import sys
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
 from ast_nodes import (
     Program, Statement, Expression,
     LoadStatement, NormalizeStatement, AggregateStatement,
     UnitConvertStatement, EnrichStatement, ComputeStatement, ValidateStatement,
     IdentifierExpr, NumberExpr, StringExpr, BinaryOpExpr, FunctionCallExpr, ConcatenationExpr
 )
+from ast_optimize import canonicalize
+
+
+# Numeric field names that should be converted to numbers
+_NUMERIC_FIELDS = frozenset({'value', 'amount', 'quantity', 'count', 'price', 'cost', 'total', 'sum', 'factor', 'rate', 'coefficient'})
+
+# Longest rendered expression kept in the memo table; caching every level
+# of a deeply nested expression would hold O(depth^2) characters
+_MEMO_MAX_LEN = 256
+
+# Time window mode -> (Cypher temporal type, truncation unit)
+_TIME_TRUNC = {
+    'monthly': ('date', 'month'),
+    'month': ('date', 'month'),
+    'daily': ('date', 'day'),
+    'day': ('date', 'day'),
+    'yearly': ('date', 'year'),
+    'year': ('date', 'year'),
+    'weekly': ('date', 'week'),
+    'week': ('date', 'week'),
+    'hourly': ('datetime', 'hour'),
+    'hour': ('datetime', 'hour'),
+}
+
+# Default to monthly if unknown
+_DEFAULT_TIME_TRUNC = _TIME_TRUNC['monthly']
+
+# DSL variable prefix -> Cypher variable bound in the generated MATCH
+_VAR_ALIAS = {
+    'activity': 'a',
+    'a': 'a',
+    'emission_factor': 'ef',
+    'ef': 'ef',
+    'factor': 'ef',
+    'emission': 'e',
+    'e': 'e',
+}
+
+
+# Rows per transaction for LOAD_CSV
+DEFAULT_LOAD_BATCH_SIZE = 10000
+
+
+def _cypher_str(value: str) -> str:
+    """Quote a value as a Cypher string literal, escaping backslashes and quotes."""
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
 
 
 class CypherGenerator:
     """Generates Cypher queries from AST nodes."""
 
-    def __init__(self):
-        self.queries: List[str] = []
+    # Statement type -> name of the method that emits it
+    _DISPATCH = {
+        LoadStatement: 'generate_load',
+        NormalizeStatement: 'generate_normalize',
+        AggregateStatement: 'generate_aggregate',
+        UnitConvertStatement: 'generate_unit_convert',
+        EnrichStatement: 'generate_enrich',
+        ComputeStatement: 'generate_compute',
+        ValidateStatement: 'generate_validate',
+    }
+
+    def __init__(self, parameterize: bool = False, out: Optional[TextIO] = None,
+                 load_batch_size: Optional[int] = DEFAULT_LOAD_BATCH_SIZE,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            parameterize: Emit string literals as $pN parameters collected in
+                self.params instead of inlining them in the query text
+            out: Text stream to write generated code to as it is produced;
+                by default it is collected in memory and returned
+            load_batch_size: Rows per transaction for LOAD_CSV
+                (CALL { ... } IN TRANSACTIONS); None or 0 loads each file
+                in a single transaction
+            workers: Number of workers to render statements in parallel;
+                None or 1 renders sequentially. Ignored in parameterized
+                mode, where parameter numbering depends on statement order.
+        """
+        self.parameterize = parameterize
+        self.load_batch_size = load_batch_size
+        self.workers = workers
+        self.params: Dict[str, str] = {}
+        self._param_names: Dict[str, str] = {}
+        self._target = out
+        # In-memory output when no target stream is given
+        self._buffer: Optional[io.StringIO] = None
+        self.out: TextIO = out if out is not None else io.StringIO()
+        self._write = self.out.write
+        # Separator owed before the next line: '' at start of output,
+        # '\n' between lines, '\n\n' between statements
+        self._pending = ''
+        # Rendered expressions, keyed on (id(node), context variable). Each
+        # entry holds its node, so the id cannot be reused by another object
+        # while the entry exists. Cleared by each public generate* call.
+        self._expr_cache: Dict[Tuple[int, Optional[str]], Tuple[Expression, str]] = {}
+        self._handlers: Dict[type, Callable[[Statement], None]] = {
+            cls: getattr(self, name) for cls, name in self._DISPATCH.items()
+        }
+
+    def generate(self, program: Program) -> Optional[str]:
+        """
+        Generate Cypher code from the AST.
+
+        Returns:
+            The generated code, or None if it was written to the `out` stream
+        """
+        if self._target is None:
+            self.out = self._buffer = io.StringIO()
+            self._write = self.out.write
+        self._pending = ''
+        self._expr_cache = {}
+        self.params = {}
+        self._param_names = {}
+
+        if self.workers and self.workers > 1 and not self.parameterize and len(program.statements) > 1:
+            self._generate_parallel(program)
+        else:
+            self._generate_sequential(program)
+        self._expr_cache = {}
 
-    def generate(self, program: Program) -> str:
-        """Generate Cypher code from the AST."""
-        self.queries = []
+        if self._buffer is not None:
+            return self._buffer.getvalue()
+        return None
 
+    def _generate_sequential(self, program: Program) -> None:
+        """Write all statements in source order."""
         for statement in program.statements:
-            query = self.generate_statement(statement)
-            if query:
-                self.queries.append(query)
-
-        return '\n\n'.join(self.queries)
-
-    def generate_statement(self, stmt: Statement) -> str:
-        """Generate Cypher for a single statement."""
-        if isinstance(stmt, LoadStatement):
-            return self.generate_load(stmt)
-        elif isinstance(stmt, NormalizeStatement):
-            return self.generate_normalize(stmt)
-        elif isinstance(stmt, AggregateStatement):
-            return self.generate_aggregate(stmt)
-        elif isinstance(stmt, UnitConvertStatement):
-            return self.generate_unit_convert(stmt)
-        elif isinstance(stmt, EnrichStatement):
-            return self.generate_enrich(stmt)
-        elif isinstance(stmt, ComputeStatement):
-            return self.generate_compute(stmt)
-        elif isinstance(stmt, ValidateStatement):
-            return self.generate_validate(stmt)
+            handler = self._handler_for(type(statement))
+            if handler is None:
+                continue
+            # Statements are separated by a blank line; a statement that
+            # writes nothing leaves no separator behind
+            if self._pending:
+                self._pending = '\n\n'
+            handler(statement)
+
+    def _generate_parallel(self, program: Program) -> None:
+        """
+        Render contiguous chunks of statements in worker pools and write them in order.
+
+        Statement generation has no shared state, so each chunk gets its own
+        generator. Threads only scale on free-threaded builds; with the GIL
+        enabled, chunks are pickled and rendered in separate processes
+        instead. Pickling recurses into expressions, so a program with
+        expressions nested too deeply for it is rendered sequentially.
+        """
+        statements = program.statements
+        workers = min(self.workers or 1, len(statements))
+        size = -(-len(statements) // workers)
+        chunks = [statements[i:i + size] for i in range(0, len(statements), size)]
+
+        render: Callable[[Any, Optional[int]], str] = _render_chunk
+        args: List[Any] = chunks
+        pool: Executor
+        if getattr(sys, '_is_gil_enabled', lambda: True)():
+            try:
+                args = [pickle.dumps(chunk, pickle.HIGHEST_PROTOCOL) for chunk in chunks]
+            except RecursionError:
+                self._generate_sequential(program)
+                return
+            render = _render_pickled_chunk
+            pool = ProcessPoolExecutor(max_workers=workers)
         else:
-            return ''
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool:
+            rendered = pool.map(render, args, [self.load_batch_size] * len(args))
+            for text in rendered:
+                if not text:
+                    continue
+                if self._pending:
+                    self._pending = '\n\n'
+                self._emit(text)
+
+    def generate_statement(self, stmt: Statement) -> None:
+        """Write Cypher for a single statement to the output."""
+        self._expr_cache = {}
+        handler = self._handler_for(type(stmt))
+        if handler is not None:
+            handler(stmt)
+
+    def _handler_for(self, kind: type) -> Optional[Callable[[Statement], None]]:
+        """Return the emitter for a statement type, or None if it has no output."""
+        handler = self._handlers.get(kind)
+        if handler is None:
+            # Subclass of a known statement type: resolve once and remember
+            for cls in kind.__mro__[1:]:
+                if cls in self._handlers:
+                    handler = self._handlers[kind] = self._handlers[cls]
+                    break
+        return handler
+
+    def _emit(self, line: str) -> None:
+        """Write one line (or several, newline-separated) to the output."""
+        self._write(self._pending)
+        self._write(line)
+        self._pending = '\n'
+
+    def _lit(self, value: str) -> str:
+        """Render a string value as an escaped literal, or as a parameter reference."""
+        if not self.parameterize:
+            return _cypher_str(value)
+        name = self._param_names.get(value)
+        if name is None:
+            name = f"p{len(self.params)}"
+            self._param_names[value] = name
+            self.params[name] = value
+        return f"${name}"
+
+    def _emit_fields(self, fields: List[str]) -> None:
+        """Write comma-separated field lines."""
+        self._emit(",\n".join(fields))
 
     def _time_window_to_cypher(self, mode: str, field: str) -> str:
         """
@@ -60,73 +238,82 @@ class CypherGenerator:
         Returns:
             Cypher expression for time window truncation
         """
-        mode_lower = mode.lower()
-
-        if mode_lower == 'monthly' or mode_lower == 'month':
-            return f"date.truncate('month', datetime({field}))"
-        elif mode_lower == 'daily' or mode_lower == 'day':
-            return f"date.truncate('day', datetime({field}))"
-        elif mode_lower == 'yearly' or mode_lower == 'year':
-            return f"date.truncate('year', datetime({field}))"
-        elif mode_lower == 'weekly' or mode_lower == 'week':
-            return f"date.truncate('week', datetime({field}))"
-        elif mode_lower == 'hourly' or mode_lower == 'hour':
-            return f"datetime.truncate('hour', datetime({field}))"
-        else:
-            # Default to monthly if unknown
-            return f"date.truncate('month', datetime({field}))"
+        namespace, unit = _TIME_TRUNC.get(mode.lower(), _DEFAULT_TIME_TRUNC)
+        return f"{namespace}.truncate('{unit}', datetime({field}))"
 
-    def generate_load(self, stmt: LoadStatement) -> str:
+    def generate_load(self, stmt: LoadStatement) -> None:
         """Generate Cypher for LOAD_CSV statement."""
-        # Numeric field names that should be converted to numbers
-        numeric_fields = {'value', 'amount', 'quantity', 'count', 'price', 'cost', 'total', 'sum', 'factor', 'rate', 'coefficient'}
-
-        lines = [f"// LOAD_CSV: {stmt.path} AS {stmt.node_label}"]
-        lines.append(f'LOAD CSV WITH HEADERS FROM "file:///{stmt.path}" AS row')
-        lines.append("WITH row")
-
-        # Create factory node
-        if 'factory' in stmt.column_map or 'factory_id' in stmt.column_map.values():
-            lines.append("MERGE (f:factory { id: row.factory })")
-
-        # Create main node with mapped columns
-        fields = []
-        for src, dst in stmt.column_map.items():
-            # Convert numeric fields using toFloat()
-            if dst.lower() in numeric_fields:
-                fields.append(f"  {dst}: toFloat(row.{src})")
-            else:
-                fields.append(f"  {dst}: row.{src}")
-
-        lines.append(f"CREATE (m:{stmt.node_label} {{")
-        lines.append(",\n".join(fields))
-        lines.append("})")
-
-        # Create relationship to factory if applicable
-        if 'factory' in stmt.column_map or 'factory_id' in stmt.column_map.values():
-            lines.append("MERGE (m)-[:AT_FACTORY]->(f);")
+        batched = (self.load_batch_size or 0) > 0
+        indent = '    ' if batched else '  '
+
+        # Create main node with mapped columns, converting numeric fields using toFloat()
+        fields = ",\n".join(
+            f"{indent}{dst}: toFloat(row.{src})" if dst.lower() in _NUMERIC_FIELDS else f"{indent}{dst}: row.{src}"
+            for src, dst in stmt.column_map
+        )
+
+        path = stmt.path
+        label = stmt.node_label
+        if batched:
+            factory = "  MERGE (f:factory { id: row.factory })\n" if stmt.has_factory else ""
+            link = "  MERGE (m)-[:AT_FACTORY]->(f)\n" if stmt.has_factory else ""
+            self._emit(f"// LOAD_CSV: {path} AS {label}\n"
+                       f'LOAD CSV WITH HEADERS FROM "file:///{path}" AS row\n'
+                       f"CALL {{\n"
+                       f"  WITH row\n"
+                       f"{factory}"
+                       f"  CREATE (m:{label} {{\n"
+                       f"{fields}\n"
+                       f"  }})\n"
+                       f"{link}"
+                       f"}} IN TRANSACTIONS OF {self.load_batch_size} ROWS;")
         else:
-            lines.append(";")
-
-        return '\n'.join(lines)
-
-    def generate_normalize(self, stmt: NormalizeStatement) -> str:
-        """Generate Cypher for NORMALIZE statement."""
-        lines = [f"// NORMALIZE: {stmt.node_label}"]
-
-        for prop_name, mappings in stmt.normalizations.items():
-            for old_val, new_val in mappings.items():
-                lines.append(f"MATCH (n:{stmt.node_label})")
-                lines.append(f"WHERE n.{prop_name} = '{old_val}'")
-                lines.append(f"SET n.{prop_name} = '{new_val}';")
-                lines.append("")
-
-        return '\n'.join(lines).rstrip()
-
-    def generate_aggregate(self, stmt: AggregateStatement) -> str:
+            factory = "MERGE (f:factory { id: row.factory })\n" if stmt.has_factory else ""
+            link = "MERGE (m)-[:AT_FACTORY]->(f);" if stmt.has_factory else ";"
+            self._emit(f"// LOAD_CSV: {path} AS {label}\n"
+                       f'LOAD CSV WITH HEADERS FROM "file:///{path}" AS row\n'
+                       f"WITH row\n"
+                       f"{factory}"
+                       f"CREATE (m:{label} {{\n"
+                       f"{fields}\n"
+                       f"}})\n"
+                       f"{link}")
+
+    def generate_normalize(self, stmt: NormalizeStatement) -> None:
+        """Generate Cypher for NORMALIZE statement.
+
+        Each property becomes a single query that rewrites all of its
+        old -> new value pairs with one CASE expression. The pairs are
+        applied at once rather than in turn, so a value is rewritten at
+        most once: with a -> b and b -> c, a becomes b, whatever the order.
+        """
+        emit = self._emit
+        lit = self._lit
+        label = stmt.node_label
+        emit(f"// NORMALIZE: {label}")
+
+        # Queries after the first are preceded by a blank line
+        sep = ''
+        for prop_name, mappings in stmt.normalizations:
+            if not mappings:
+                continue
+            old_values = ", ".join(lit(old_val) for old_val, _ in mappings)
+            cases = "\n".join(
+                f"  WHEN {lit(old_val)} THEN {lit(new_val)}"
+                for old_val, new_val in mappings
+            )
+            emit(f"{sep}MATCH (n:{label})\n"
+                 f"WHERE n.{prop_name} IN [{old_values}]\n"
+                 f"SET n.{prop_name} = CASE n.{prop_name}\n"
+                 f"{cases}\n"
+                 f"END;")
+            sep = '\n'
+
+    def generate_aggregate(self, stmt: AggregateStatement) -> None:
         """Generate Cypher for AGGREGATE statement."""
-        lines = [f"// AGGREGATE: {stmt.source_label} -> {stmt.target_label}"]
-        lines.append(f"MATCH (m:{stmt.source_label})")
+        emit = self._emit
+        emit(f"// AGGREGATE: {stmt.source_label} -> {stmt.target_label}")
+        emit(f"MATCH (m:{stmt.source_label})")
 
         # Build WITH clause for grouping and aggregation
         with_parts = []
@@ -153,8 +340,8 @@ class CypherGenerator:
             elif agg.function == 'first':
                 with_parts.append(f"  COLLECT(m.{agg.field})[0] AS {agg.alias}")
 
-        lines.append("WITH")
-        lines.append(",\n".join(with_parts))
+        emit("WITH")
+        self._emit_fields(with_parts)
 
         # Create aggregated node
         create_fields = []
@@ -167,143 +354,190 @@ class CypherGenerator:
         if stmt.time_window:
             create_fields.append(f"  {stmt.time_window.target_field}: {stmt.time_window.target_field}")
 
-        lines.append(f"CREATE (a:{stmt.target_label} {{")
-        lines.append(",\n".join(create_fields))
-        lines.append("})")
+        # Link to factory if applicable, resolving the factory in the same
+        # pipeline as the grouping instead of a second MATCH per created node
+        if stmt.groups_by_factory:
+            emit("MERGE (f:factory { id: factory_id })")
 
-        # Link to factory if applicable
-        if 'factory_id' in stmt.group_by:
-            lines.append("WITH a")
-            lines.append("MATCH (f:factory { id: a.factory_id })")
-            lines.append("MERGE (a)-[:AT_FACTORY]->(f);")
-        else:
-            lines.append(";")
+        emit(f"CREATE (a:{stmt.target_label} {{")
+        self._emit_fields(create_fields)
+        emit("})")
 
-        return '\n'.join(lines)
+        if stmt.groups_by_factory:
+            emit("MERGE (a)-[:AT_FACTORY]->(f);")
+        else:
+            emit(";")
 
-    def generate_unit_convert(self, stmt: UnitConvertStatement) -> str:
+    def generate_unit_convert(self, stmt: UnitConvertStatement) -> None:
         """Generate Cypher for UNIT_CONVERT statement."""
-        lines = [f"// UNIT_CONVERT: {stmt.node_label}.{stmt.field} FROM {stmt.from_unit} TO {stmt.to_unit}"]
-        lines.append(f"// Note: Load conversion factors from {stmt.conversion_table}")
-        lines.append(f"// This is a placeholder - actual implementation requires loading the conversion table")
-        lines.append(f"MATCH (n:{stmt.node_label})")
-        lines.append(f"WHERE n.unit = '{stmt.from_unit}'")
-        lines.append(f"// MERGE with conversion factor table here")
-        lines.append(f"// SET n.{stmt.field} = n.{stmt.field} * conversion_factor")
-        lines.append(f"SET n.unit = '{stmt.to_unit}';")
-
-        return '\n'.join(lines)
-
-    def generate_enrich(self, stmt: EnrichStatement) -> str:
+        label = stmt.node_label
+        field = stmt.field
+        self._emit(f"// UNIT_CONVERT: {label}.{field} FROM {stmt.from_unit} TO {stmt.to_unit}\n"
+                   f"// Note: Load conversion factors from {stmt.conversion_table}\n"
+                   f"// This is a placeholder - actual implementation requires loading the conversion table\n"
+                   f"MATCH (n:{label})\n"
+                   f"WHERE n.unit = {self._lit(stmt.from_unit)}\n"
+                   f"// MERGE with conversion factor table here\n"
+                   f"// SET n.{field} = n.{field} * conversion_factor\n"
+                   f"SET n.unit = {self._lit(stmt.to_unit)};")
+
+    def generate_enrich(self, stmt: EnrichStatement) -> None:
         """Generate Cypher for ENRICH statement."""
-        lines = [f"// ENRICH: {stmt.source_label} WITH {stmt.factor_table}"]
-        lines.append(f"MATCH (a:{stmt.source_label}), (ef:{stmt.factor_table})")
-        lines.append(f"WHERE a.{stmt.match_key} = ef.{stmt.match_key}")
-
-        # Build output fields
-        create_fields = []
-        for field_name, expr in stmt.output_fields.items():
-            expr_str = self.generate_expression(expr)
-            create_fields.append(f"  {field_name}: {expr_str}")
-
-        lines.append(f"CREATE (e:{stmt.target_label} {{")
-        lines.append(",\n".join(create_fields))
-        lines.append("})")
-        lines.append(f"MERGE (e)-[:FROM_ACTIVITY]->(a);")
-
-        return '\n'.join(lines)
-
-    def generate_compute(self, stmt: ComputeStatement) -> str:
+        fields = ",\n".join(
+            f"  {field_name}: {self._render_expression(expr)}"
+            for field_name, expr in stmt.output_fields
+        )
+        source = stmt.source_label
+        key = stmt.match_key
+        self._emit(f"// ENRICH: {source} WITH {stmt.factor_table}\n"
+                   f"MATCH (a:{source}), (ef:{stmt.factor_table})\n"
+                   f"WHERE a.{key} = ef.{key}\n"
+                   f"CREATE (e:{stmt.target_label} {{\n"
+                   f"{fields}\n"
+                   f"}})\n"
+                   f"MERGE (e)-[:FROM_ACTIVITY]->(a);")
+
+    def generate_compute(self, stmt: ComputeStatement) -> None:
         """Generate Cypher for COMPUTE statement."""
-        lines = [f"// COMPUTE: {stmt.field_name} FOR {stmt.source_label}"]
-        lines.append(f"MATCH (e:{stmt.source_label})")
-
         # Group by clause - all expressions in WITH must be aliased
         group_by_str = ', '.join(f"e.{field} AS {field}" for field in stmt.group_by)
-        lines.append(f"WITH {group_by_str}, {self.generate_expression(stmt.expression, 'e')} AS {stmt.field_name}")
 
         # Use the aliased variable name in MERGE
-        first_group_field = stmt.group_by[0]
-        lines.append(f"MERGE (g:{stmt.target_label} {{ {first_group_field}: {first_group_field} }})")
-        lines.append(f"SET g.{stmt.field_name} = {stmt.field_name};")
-
-        return '\n'.join(lines)
-
-    def generate_validate(self, stmt: ValidateStatement) -> str:
+        field = stmt.field_name
+        key = stmt.group_by[0]
+        self._emit(f"// COMPUTE: {field} FOR {stmt.source_label}\n"
+                   f"MATCH (e:{stmt.source_label})\n"
+                   f"WITH {group_by_str}, {self._render_expression(stmt.expression, 'e')} AS {field}\n"
+                   f"MERGE (g:{stmt.target_label} {{ {key}: {key} }})\n"
+                   f"SET g.{field} = {field};")
+
+    def generate_validate(self, stmt: ValidateStatement) -> None:
         """Generate Cypher for VALIDATE statement."""
-        lines = [f"// VALIDATE: {stmt.node_label} WITH {stmt.rule_name}"]
-        lines.append(f"// Validation rule: {stmt.rule_name}")
-        lines.append(f"MATCH (n:{stmt.node_label})")
-        lines.append(f"// Add validation logic based on rule: {stmt.rule_name}")
-        lines.append(f"RETURN n;")
-
-        return '\n'.join(lines)
-
-    def generate_expression(self, expr: Expression, context_var: str = None) -> str:
+        rule = stmt.rule_name
+        self._emit(f"// VALIDATE: {stmt.node_label} WITH {rule}\n"
+                   f"// Validation rule: {rule}\n"
+                   f"MATCH (n:{stmt.node_label})\n"
+                   f"// Add validation logic based on rule: {rule}\n"
+                   f"RETURN n;")
+
+    def generate_expression(self, expr: Expression, context_var: Optional[str] = None) -> str:
         """Generate Cypher expression from AST expression.
 
         Args:
             expr: Expression to generate
             context_var: Current context variable (e.g., 'e', 'a') for resolving identifiers
         """
+        self._expr_cache = {}
+        return self._render_expression(expr, context_var)
+
+    def _render_expression(self, expr: Expression, context_var: Optional[str] = None) -> str:
+        """Render an expression, reusing output memoized earlier in the current call."""
+        # Iterative postorder walk: a node is pushed once to schedule its
+        # children and again (expanded=True) to combine their rendered strings.
+        # Rendered output only depends on the node and, for function calls,
+        # the context variable; shared subtrees are rendered once per run.
+        # No recursion, so expression depth is not bound by the recursion limit.
+        cache = self._expr_cache
+        results: List[str] = []
+        stack = [(expr, False)]
+
+        while stack:
+            node, expanded = stack.pop()
+            key = (id(node), context_var)
+            cached = cache.get(key)
+            if cached is not None and cached[0] is node:
+                results.append(cached[1])
+                continue
+
+            if isinstance(node, (IdentifierExpr, StringExpr, NumberExpr)):
+                result = self._render_leaf(node)
+
+            elif isinstance(node, BinaryOpExpr):
+                if not expanded:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right = results.pop()
+                left = results.pop()
+                result = f"({left} {node.operator} {right})"
+
+            elif isinstance(node, FunctionCallExpr):
+                # Add context variable prefix if provided and argument is a simple identifier
+                arg = node.argument
+                if context_var and '.' not in arg:
+                    arg = f"{context_var}.{arg}"
+                result = f"{node.function_name.upper()}({arg})"
+
+            elif isinstance(node, ConcatenationExpr):
+                if not expanded:
+                    stack.append((node, True))
+                    stack.extend((part, False) for part in reversed(node.parts))
+                    continue
+                start = len(results) - len(node.parts)
+                result = " + ".join(results[start:])
+                del results[start:]
+
+            else:
+                result = ''
+
+            if len(result) <= _MEMO_MAX_LEN:
+                cache[key] = (node, result)
+            results.append(result)
+
+        return results[0]
+
+    def _render_leaf(self, expr: Expression) -> str:
+        """Render an identifier, number or string literal."""
         if isinstance(expr, IdentifierExpr):
             # Handle dotted identifiers (e.g., activity.id)
             parts = expr.name.split('.')
             if len(parts) == 2:
                 # Map to appropriate variable
-                if parts[0] in ['activity', 'a']:
-                    return f"a.{parts[1]}"
-                elif parts[0] in ['emission_factor', 'ef', 'factor']:
-                    return f"ef.{parts[1]}"
-                elif parts[0] in ['emission', 'e']:
-                    return f"e.{parts[1]}"
-                else:
-                    return expr.name
+                var = _VAR_ALIAS.get(parts[0])
+                if var:
+                    return f"{var}.{parts[1]}"
             return expr.name
 
         elif isinstance(expr, NumberExpr):
             return str(expr.value)
 
         elif isinstance(expr, StringExpr):
-            return f"'{expr.value}'"
-
-        elif isinstance(expr, BinaryOpExpr):
-            left = self.generate_expression(expr.left, context_var)
-            right = self.generate_expression(expr.right, context_var)
-            return f"({left} {expr.operator} {right})"
-
-        elif isinstance(expr, FunctionCallExpr):
-            # Add context variable prefix if provided and argument is a simple identifier
-            arg = expr.argument
-            if context_var and '.' not in arg:
-                arg = f"{context_var}.{arg}"
-            return f"{expr.function_name.upper()}({arg})"
-
-        elif isinstance(expr, ConcatenationExpr):
-            parts = []
-            for part in expr.parts:
-                if isinstance(part, StringExpr):
-                    parts.append(f"'{part.value}'")
-                elif isinstance(part, IdentifierExpr):
-                    # Handle dotted access
-                    if '.' in part.name:
-                        field_parts = part.name.split('.')
-                        if field_parts[0] in ['activity', 'a']:
-                            parts.append(f"a.{field_parts[1]}")
-                        elif field_parts[0] in ['emission', 'e']:
-                            parts.append(f"e.{field_parts[1]}")
-                        else:
-                            parts.append(part.name)
-                    else:
-                        parts.append(part.name)
-                else:
-                    parts.append(self.generate_expression(part, context_var))
-            return " + ".join(parts)
+            return self._lit(expr.value)
 
         return ''
 
 
-def generate_cypher(program: Program) -> str:
-    """Generate Cypher code from an AST."""
-    generator = CypherGenerator()
+def _render_chunk(statements: List[Statement], load_batch_size: Optional[int]) -> str:
+    """Render a run of statements with a fresh generator (worker entry point)."""
+    return CypherGenerator(load_batch_size=load_batch_size).generate(Program(statements)) or ''
+
+
+def _render_pickled_chunk(payload: bytes, load_batch_size: Optional[int]) -> str:
+    """Render a pickled run of statements (worker process entry point)."""
+    statements: List[Statement] = pickle.loads(payload)
+    return _render_chunk(statements, load_batch_size)
+
+
+def generate_cypher(program: Program, out: Optional[TextIO] = None,
+                    load_batch_size: Optional[int] = DEFAULT_LOAD_BATCH_SIZE,
+                    workers: Optional[int] = None, optimize: bool = False) -> Optional[str]:
+    """
+    Generate Cypher code from an AST.
+
+    Args:
+        program: Parsed program
+        out: Optional text stream; if given, code is written to it as it is
+            generated instead of being returned as one string
+        load_batch_size: Rows per transaction for LOAD_CSV; None or 0 disables batching
+        workers: Number of parallel workers for large programs; None renders sequentially
+        optimize: Fold numeric constants and share identical expressions first;
+            this only pays off for programs that repeat expressions
+
+    Returns:
+        The generated code, or None if it was written to `out`
+    """
+    generator = CypherGenerator(out=out, load_batch_size=load_batch_size, workers=workers)
+    if optimize:
+        program = canonicalize(program)
     return generator.generate(program)
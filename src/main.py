@@ -5,21 +5,184 @@ Main entry point for the Dynamic Ontology DSL compiler.
 This script reads a DSL file and generates Cypher queries.
 """
 
+import io
+import os
 import sys
+import stat
+import shutil
+import hashlib
 import argparse
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
 from parser import parse_dsl
-from codegen import generate_cypher
+from codegen import generate_cypher, DEFAULT_LOAD_BATCH_SIZE
 
+# Modules whose source determines the generated Cypher
+_COMPILER_MODULES = ('ast_nodes', 'parser', 'ast_optimize', 'codegen')
 
-def compile_dsl_file(input_path: str, output_path: str = None):
+# Cache entries kept; the least recently used beyond this are removed
+_CACHE_MAX_ENTRIES = 64
+
+
+@contextmanager
+def _replace_on_success(path, mode: str = 'w'):
+    """
+    Open a temporary file beside path, and move it over path when the block succeeds.
+
+    If the block raises, the temporary file is removed and path is left as
+    it was, so a failed run never leaves a truncated file behind. Symlinks
+    are followed, and the replaced file keeps its permissions. Targets
+    that are not regular files (devices, pipes) or that have other hard
+    links are written in place instead.
+    """
+    encoding = None if 'b' in mode else 'utf-8'
+    target = os.path.realpath(path)
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
+        st = None
+
+    if st is not None and (not stat.S_ISREG(st.st_mode) or st.st_nlink > 1):
+        with open(path, mode, encoding=encoding) as f:
+            yield f
+        return
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f'.{os.path.basename(target)}.', suffix='.tmp')
+    try:
+        if st is not None:
+            mode_bits = stat.S_IMODE(st.st_mode)
+        else:
+            # mkstemp creates the file private; give it the usual permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            mode_bits = 0o666 & ~umask
+        os.chmod(tmp_path, mode_bits)
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _cache_dir() -> Path:
+    """Directory holding cached compiler output."""
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'ccw-dsl'
+
+
+def _cache_key(dsl_text: str, batch_size: int, optimize: bool = False) -> str:
+    """
+    Hash everything the generated Cypher depends on.
+
+    The compiler's own source is included so that cached output is
+    invalidated when the compiler changes.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for name in _COMPILER_MODULES:
+        with open(sys.modules[name].__file__, 'rb') as f:
+            h.update(f.read())
+    h.update(f'batch_size={batch_size or 0}\0'.encode())
+    h.update(f'optimize={int(optimize)}\0'.encode())
+    h.update(dsl_text.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _cache_store(cache_path: Path, output_path: str):
+    """Copy a finished output file into the cache. Failures are ignored."""
+    # Devices and pipes cannot be read back
+    if not os.path.isfile(output_path):
+        return
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'rb') as src, _replace_on_success(cache_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        _cache_prune(cache_path.parent)
+    except OSError:
+        pass
+
+
+def _cache_prune(cache_dir: Path):
+    """Remove the least recently used cache entries beyond _CACHE_MAX_ENTRIES."""
+    entries = []
+    for path in cache_dir.glob('*.cypher'):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            pass
+    entries.sort(reverse=True)
+    for _, path in entries[_CACHE_MAX_ENTRIES:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _send_cached(cache_path: Path, output_path: str = None) -> bool:
+    """
+    Copy cached output to the output file, or to stdout.
+
+    Returns:
+        False if the cache entry could not be read
+    """
+    try:
+        src = open(cache_path, 'rb')
+    except OSError:
+        return False
+
+    with src:
+        # Mark the entry as recently used for _cache_prune
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+
+        if not output_path:
+            shutil.copyfileobj(io.TextIOWrapper(src, encoding='utf-8'), sys.stdout)
+            print()
+            return True
+
+        with _replace_on_success(output_path, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                    if not sent:
+                        break
+                    offset += sent
+            except (AttributeError, OSError):
+                # sendfile is unavailable on this platform or for these files
+                pass
+            src.seek(offset)
+            shutil.copyfileobj(src, dst)
+    return True
+
+
+def compile_dsl_file(input_path: str, output_path: str = None,
+                     batch_size: int = DEFAULT_LOAD_BATCH_SIZE, workers: int = None,
+                     use_cache: bool = True, optimize: bool = False):
     """
     Compile a DSL file to Cypher queries.
 
+    Output files are cached under $XDG_CACHE_HOME/ccw-dsl (default
+    ~/.cache/ccw-dsl), keyed on the DSL text, the options and the compiler
+    version, so recompiling an unchanged file skips parsing and code
+    generation. Output printed to stdout is streamed and not stored, but
+    is served from the cache when an entry exists.
+
     Args:
         input_path: Path to the input DSL file
         output_path: Optional path to write the output Cypher file
+        batch_size: Rows per transaction for LOAD_CSV (0 disables batching)
+        workers: Number of parallel code generation workers (default: sequential)
+        use_cache: Reuse and store previously generated output
+        optimize: Fold numeric constants and share identical expressions
     """
     # Read input file
     try:
@@ -32,6 +195,25 @@ def compile_dsl_file(input_path: str, output_path: str = None):
         print(f"Error reading file: {e}", file=sys.stderr)
         sys.exit(1)
 
+    cache_path = None
+    if use_cache:
+        cache_path = _cache_dir() / f'{_cache_key(dsl_text, batch_size, optimize)}.cypher'
+        if cache_path.is_file():
+            if not output_path:
+                print("\n" + "="*60, file=sys.stderr)
+                print("Generated Cypher Code (cached):", file=sys.stderr)
+                print("="*60 + "\n", file=sys.stderr)
+            try:
+                hit = _send_cached(cache_path, output_path)
+            except OSError as e:
+                print(f"Error writing output file: {e}", file=sys.stderr)
+                sys.exit(1)
+            if hit:
+                if output_path:
+                    print(f"✓ Reused cached Cypher code for {input_path}", file=sys.stderr)
+                    print(f"✓ Written to {output_path}", file=sys.stderr)
+                return
+
     # Parse DSL
     try:
         print(f"Parsing {input_path}...", file=sys.stderr)
@@ -44,29 +226,33 @@ def compile_dsl_file(input_path: str, output_path: str = None):
         print(f"Parse error: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Generate Cypher
-    try:
-        print("Generating Cypher code...", file=sys.stderr)
-        cypher_code = generate_cypher(ast)
-        print("✓ Cypher code generated successfully", file=sys.stderr)
-    except Exception as e:
-        print(f"Code generation error: {e}", file=sys.stderr)
-        sys.exit(1)
-
-    # Output
+    # Generate Cypher, streaming it straight to the destination
+    print("Generating Cypher code...", file=sys.stderr)
     if output_path:
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(cypher_code)
-            print(f"✓ Written to {output_path}", file=sys.stderr)
-        except Exception as e:
+            # Written to a temporary file first, so a failure leaves no partial output
+            with _replace_on_success(output_path) as f:
+                generate_cypher(ast, f, batch_size, workers, optimize)
+        except OSError as e:
             print(f"Error writing output file: {e}", file=sys.stderr)
             sys.exit(1)
+        except Exception as e:
+            print(f"Code generation error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print("✓ Cypher code generated successfully", file=sys.stderr)
+        print(f"✓ Written to {output_path}", file=sys.stderr)
+        if cache_path is not None:
+            _cache_store(cache_path, output_path)
     else:
         print("\n" + "="*60, file=sys.stderr)
         print("Generated Cypher Code:", file=sys.stderr)
         print("="*60 + "\n", file=sys.stderr)
-        print(cypher_code)
+        try:
+            generate_cypher(ast, sys.stdout, batch_size, workers, optimize)
+            print()
+        except Exception as e:
+            print(f"\nCode generation error: {e}", file=sys.stderr)
+            sys.exit(1)
 
 
 def main():
@@ -82,6 +268,15 @@ Examples:
   # Compile and save to file
   python main.py sample.dsl -o output.cypher
 
+  # Load each CSV in a single transaction (no batching)
+  python main.py sample.dsl --batch-size 0
+
+  # Fold constant arithmetic such as 2 * 0.5 in ENRICH and COMPUTE expressions
+  python main.py sample.dsl -O
+
+  # Recompile without reading or writing the output cache
+  python main.py sample.dsl --no-cache
+
   # Show version
   python main.py --version
         """
@@ -98,6 +293,32 @@ Examples:
         default=None
     )
 
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        help=f'Rows per transaction for LOAD_CSV, 0 to disable batching (default: {DEFAULT_LOAD_BATCH_SIZE})',
+        default=DEFAULT_LOAD_BATCH_SIZE
+    )
+
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        help='Generate code for large programs with N parallel workers (default: sequential)',
+        default=None
+    )
+
+    parser.add_argument(
+        '-O', '--optimize',
+        action='store_true',
+        help='Fold numeric constants and share identical expressions before code generation'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always recompile, bypassing the output cache'
+    )
+
     parser.add_argument(
         '--version',
         action='version',
@@ -106,7 +327,8 @@ Examples:
 
     args = parser.parse_args()
 
-    compile_dsl_file(args.input, args.output)
+    compile_dsl_file(args.input, args.output, args.batch_size, args.workers,
+                     use_cache=not args.no_cache, optimize=args.optimize)
 
 
 if __name__ == '__main__':
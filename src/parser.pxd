@@ -0,0 +1,29 @@
+# Cython declarations for parser.py (optional; see README).
+#
+# Compiling parser.py with this file turns Lexer and Parser into
+# extension types with C-typed fields. The pure-Python module is used when
+# no compiled module exists.
+
+cimport cython
+
+cdef class Lexer:
+    cdef public str text
+    cdef public Py_ssize_t pos
+    cdef public object tokens
+    cdef dict _intern
+    cdef dict _numbers
+    cdef object _newlines
+
+    cpdef tokenize(self)
+
+
+@cython.final
+cdef class Parser:
+    cdef public object tokens
+    cdef public object type
+    cdef public object value
+    cdef public Py_ssize_t position
+    cdef object _next_row
+    cdef object _line_column
+    cdef list _ahead
+    cdef dict _statement_parsers
@@ -6,20 +6,24 @@ The parser is implemented as a hand-written recursive descent parser.
 """
 
 import re
-from typing import List, Optional, Dict, Any
-from enum import Enum, auto
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Iterator, List, NoReturn, Optional, Dict, Tuple, Union, Any
+from enum import IntEnum, auto
+from dataclasses import dataclass, field
 
 from ast_nodes import (
     Program, Statement, Expression,
     LoadStatement, NormalizeStatement, AggregateStatement,
     UnitConvertStatement, EnrichStatement, ComputeStatement, ValidateStatement,
     AggregationClause, TimeWindow,
-    IdentifierExpr, NumberExpr, StringExpr, BinaryOpExpr, FunctionCallExpr, ConcatenationExpr
+    NumberExpr, BinaryOpExpr, FunctionCallExpr, ConcatenationExpr,
+    mk_ident, mk_string
 )
 
 
-class TokenType(Enum):
+class TokenType(IntEnum):
     """Token types for the lexer."""
     # Keywords
     LOAD_CSV = auto()
@@ -74,7 +78,7 @@ class TokenType(Enum):
     EOF = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     """Represents a token in the DSL."""
     type: TokenType
@@ -83,6 +87,60 @@ class Token:
     column: int
 
 
+@dataclass(slots=True)
+class TokenArrays:
+    """
+    Token sequence stored column-wise, one array per Token field.
+
+    Token objects are built on demand by indexing. stream() yields
+    (type, value, index) rows, like Lexer.stream() but with token indexes
+    as positions.
+    """
+    types: 'array[int]' = field(default_factory=lambda: array('B'))
+    values: List[Any] = field(default_factory=list)
+    lines: 'array[int]' = field(default_factory=lambda: array('i'))
+    columns: 'array[int]' = field(default_factory=lambda: array('i'))
+
+    def append(self, token_type: TokenType, value: Any, line: int, column: int):
+        """Add a token at the end."""
+        self.types.append(token_type)
+        self.values.append(value)
+        self.lines.append(line)
+        self.columns.append(column)
+
+    def stream(self) -> Iterator[Tuple[int, Any, int]]:
+        """Iterate over (type, value, index) for each token."""
+        return zip(self.types, self.values, range(len(self.types)))
+
+    def line_column(self, index: int) -> Tuple[int, int]:
+        """Return the line and column of the token at an index."""
+        return self.lines[index], self.columns[index]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError('token index out of range')
+        return Token(TokenType(self.types[index]), self.values[index], self.lines[index], self.columns[index])
+
+
+# Entries kept in Lexer.number_value's cache
+_NUMBER_CACHE_SIZE = 64
+
+# Single-character tokens
+_PUNCTUATION = {
+    '{': TokenType.LBRACE, '}': TokenType.RBRACE,
+    '[': TokenType.LBRACKET, ']': TokenType.RBRACKET,
+    '(': TokenType.LPAREN, ')': TokenType.RPAREN,
+    ',': TokenType.COMMA, ':': TokenType.COLON, '.': TokenType.DOT,
+    '+': TokenType.PLUS, '-': TokenType.MINUS,
+    '*': TokenType.MULTIPLY, '/': TokenType.DIVIDE,
+}
+
+
 class Lexer:
     """Tokenizer for the DSL."""
 
@@ -116,361 +174,362 @@ class Lexer:
     def __init__(self, text: str):
         self.text = text
         self.pos = 0
-        self.line = 1
-        self.column = 1
-        self.tokens: List[Token] = []
-
-    def current_char(self) -> Optional[str]:
-        """Get the current character."""
-        if self.pos < len(self.text):
-            return self.text[self.pos]
-        return None
-
-    def peek_char(self, offset: int = 1) -> Optional[str]:
-        """Peek at a character ahead."""
-        pos = self.pos + offset
-        if pos < len(self.text):
-            return self.text[pos]
-        return None
-
-    def advance(self):
-        """Move to the next character."""
-        if self.pos < len(self.text):
-            if self.text[self.pos] == '\n':
-                self.line += 1
-                self.column = 1
-            else:
-                self.column += 1
-            self.pos += 1
-
-    def skip_whitespace(self):
-        """Skip whitespace except newlines."""
-        while self.current_char() and self.current_char() in ' \t\r':
-            self.advance()
-
-    def skip_comment(self):
-        """Skip comment lines starting with #."""
-        if self.current_char() == '#':
-            while self.current_char() and self.current_char() != '\n':
-                self.advance()
-
-    def read_string(self) -> str:
-        """Read a string literal."""
-        result = ''
-        self.advance()  # Skip opening quote
-
-        while self.current_char() and self.current_char() != '"':
-            if self.current_char() == '\\':
-                self.advance()
-                if self.current_char():
-                    result += self.current_char()
-                    self.advance()
-            else:
-                result += self.current_char()
-                self.advance()
-
-        if self.current_char() == '"':
-            self.advance()  # Skip closing quote
-
-        return result
-
-    def read_number(self) -> float:
-        """Read a numeric literal."""
-        result = ''
-
-        while self.current_char() and (self.current_char().isdigit() or self.current_char() == '.'):
-            result += self.current_char()
-            self.advance()
-
-        return float(result) if '.' in result else int(result)
-
-    def read_identifier(self) -> str:
-        """Read an identifier or keyword."""
-        result = ''
-
-        while self.current_char() and (self.current_char().isalnum() or self.current_char() in '_-'):
-            result += self.current_char()
-            self.advance()
-
-        return result
-
-    def tokenize(self) -> List[Token]:
-        """Tokenize the input text."""
-        while self.current_char():
-            self.skip_whitespace()
-
-            if not self.current_char():
+        self.tokens = TokenArrays()
+        # One shared copy of each identifier and string value; keyword
+        # tokens reuse the KEYWORDS strings
+        self._intern: Dict[str, str] = {keyword: keyword for keyword in self.KEYWORDS}
+        # Recently converted numeric literals; scripts repeat a few small
+        # constants, so a short FIFO-evicted table covers most of them
+        self._numbers: Dict[str, Union[int, float]] = {}
+        # Offsets of the newlines in text, found on first use by line_column()
+        self._newlines: Optional['array[int]'] = None
+
+    def line_column(self, offset: int) -> Tuple[int, int]:
+        """
+        Return the line and column (both 1-based) of an offset into the text.
+
+        Tokens only record their offset; this is worked out when a Token is
+        built, e.g. for an error message.
+        """
+        newlines = self._newlines
+        if newlines is None:
+            newlines = self._newlines = array('i', [match.start() for match in re.finditer('\n', self.text)])
+        line = bisect_left(newlines, offset)  # Newlines before offset
+        line_start = newlines[line - 1] + 1 if line else 0
+        return line + 1, offset - line_start + 1
+
+    def number_value(self, digits: str) -> Union[int, float]:
+        """Convert a numeric literal, reusing recent conversions."""
+        numbers = self._numbers
+        value = numbers.get(digits)
+        if value is None:
+            value = float(digits) if '.' in digits else int(digits)
+            if len(numbers) >= _NUMBER_CACHE_SIZE:
+                del numbers[next(iter(numbers))]  # Oldest entry
+            numbers[digits] = value
+        return value
+
+    def tokenize(self) -> TokenArrays:
+        """Tokenize the whole input text."""
+        tokens = self.tokens
+        add_type, add_value = tokens.types.append, tokens.values.append
+        add_line, add_column = tokens.lines.append, tokens.columns.append
+        line_column = self.line_column
+
+        for token_type, value, offset in self.stream():
+            line, column = line_column(offset)
+            add_type(token_type)
+            add_value(value)
+            add_line(line)
+            add_column(column)
+        return tokens
+
+    def stream(self) -> Iterator[Tuple[TokenType, Any, int]]:
+        """
+        Scan the input text lazily.
+
+        Yields (type, value, offset) for each token, ending with EOF; see
+        line_column() for turning an offset into a line and column. The
+        parser pulls tokens from here as it goes, so the token sequence is
+        never materialized.
+        """
+        text = self.text
+        intern = self._intern
+        numbers = self._numbers
+        keywords = self.KEYWORDS
+        match_token = _TOKEN_RE.match
+        pos = 0
+
+        while True:
+            match = match_token(text, pos)
+            kind = match.lastgroup
+            pos = match.start(kind)  # Start of the token, after whitespace and comments
+            end = match.end()
+
+            if kind == 'WORD' or kind == 'IDENT':
+                value = match.group(kind)
+                value = intern.setdefault(value, value)
+                token_type = keywords.get(value, TokenType.IDENTIFIER) if kind == 'WORD' else TokenType.IDENTIFIER
+                yield token_type, value, pos
+
+            elif kind == 'PUNCT':
+                value = match.group(kind)
+                yield _PUNCTUATION[value], value, pos
+
+            elif kind == 'STRING':
+                value = match.group('STRING_BODY')
+                if '\\' in value:
+                    value = _ESCAPE_RE.sub(r'\1', value)
+                yield TokenType.STRING, intern.setdefault(value, value), pos
+
+            elif kind == 'NUMBER':
+                digits = match.group(kind)
+                value = numbers.get(digits)
+                if value is None:
+                    value = self.number_value(digits)
+                yield TokenType.NUMBER, value, pos
+
+            elif kind == 'ARROW':
+                yield TokenType.ARROW, '->', pos
+
+            elif kind == 'END':
                 break
 
-            line, column = self.line, self.column
-
-            # Comments
-            if self.current_char() == '#':
-                self.skip_comment()
-                continue
-
-            # Newlines
-            if self.current_char() == '\n':
-                self.advance()
-                continue
-
-            # Strings
-            if self.current_char() == '"':
-                value = self.read_string()
-                self.tokens.append(Token(TokenType.STRING, value, line, column))
-                continue
-
-            # Numbers
-            if self.current_char().isdigit():
-                value = self.read_number()
-                self.tokens.append(Token(TokenType.NUMBER, value, line, column))
-                continue
-
-            # Operators and punctuation
-            if self.current_char() == '{':
-                self.tokens.append(Token(TokenType.LBRACE, '{', line, column))
-                self.advance()
-                continue
-
-            if self.current_char() == '}':
-                self.tokens.append(Token(TokenType.RBRACE, '}', line, column))
-                self.advance()
-                continue
-
-            if self.current_char() == '[':
-                self.tokens.append(Token(TokenType.LBRACKET, '[', line, column))
-                self.advance()
-                continue
-
-            if self.current_char() == ']':
-                self.tokens.append(Token(TokenType.RBRACKET, ']', line, column))
-                self.advance()
-                continue
-
-            if self.current_char() == '(':
-                self.tokens.append(Token(TokenType.LPAREN, '(', line, column))
-                self.advance()
-                continue
+            else:
+                line, column = self.line_column(pos)
+                raise SyntaxError(
+                    f"Unexpected character '{text[pos]}' at line {line}, column {column}"
+                )
 
-            if self.current_char() == ')':
-                self.tokens.append(Token(TokenType.RPAREN, ')', line, column))
-                self.advance()
-                continue
+            pos = end
 
-            if self.current_char() == ',':
-                self.tokens.append(Token(TokenType.COMMA, ',', line, column))
-                self.advance()
-                continue
+        self.pos = pos
+        yield TokenType.EOF, None, pos
 
-            if self.current_char() == ':':
-                self.tokens.append(Token(TokenType.COLON, ':', line, column))
-                self.advance()
-                continue
 
-            if self.current_char() == '.':
-                self.tokens.append(Token(TokenType.DOT, '.', line, column))
-                self.advance()
-                continue
+def _build_token_re() -> 're.Pattern[str]':
+    """
+    Build the lexer's master pattern: one alternative per kind of token.
 
-            if self.current_char() == '+':
-                self.tokens.append(Token(TokenType.PLUS, '+', line, column))
-                self.advance()
-                continue
+    Each match also consumes the whitespace (newlines included) and
+    comments before its token. Words starting like a keyword (WORD) are
+    told apart from other identifiers (IDENT), so only they need a keyword
+    lookup. Characters no other alternative accepts match OTHER, and END
+    matches at the end of the input.
+    """
+    keyword_initials = ''.join(sorted({keyword[0] for keyword in Lexer.KEYWORDS}))
+    return re.compile(r'(?:[ \t\r\n]+|#[^\n]*)*(?:' + '|'.join([
+        rf'(?P<WORD>[{keyword_initials}][\w-]*)',
+        r'(?P<IDENT>[^\W\d][\w-]*)',
+        r'(?P<ARROW>->)',
+        r'(?P<PUNCT>[{}\[\](),:.+\-*/])',
+        # An unterminated string runs to the end of the input
+        r'(?P<STRING>"(?P<STRING_BODY>(?:[^"\\]|\\[\s\S]?)*)"?)',
+        r'(?P<NUMBER>\d[\d.]*)',
+        r'(?P<END>\Z)',
+        r'(?P<OTHER>[\s\S])',
+    ]) + ')')
 
-            if self.current_char() == '*':
-                self.tokens.append(Token(TokenType.MULTIPLY, '*', line, column))
-                self.advance()
-                continue
 
-            if self.current_char() == '/':
-                self.tokens.append(Token(TokenType.DIVIDE, '/', line, column))
-                self.advance()
-                continue
+_TOKEN_RE = _build_token_re()
+_ESCAPE_RE = re.compile(r'\\([\s\S]?)')
 
-            if self.current_char() == '-':
-                if self.peek_char() == '>':
-                    self.tokens.append(Token(TokenType.ARROW, '->', line, column))
-                    self.advance()
-                    self.advance()
-                else:
-                    self.tokens.append(Token(TokenType.MINUS, '-', line, column))
-                    self.advance()
-                continue
-
-            # Identifiers and keywords
-            if self.current_char().isalpha() or self.current_char() == '_':
-                value = self.read_identifier()
-                token_type = self.KEYWORDS.get(value, TokenType.IDENTIFIER)
-                self.tokens.append(Token(token_type, value, line, column))
-                continue
-
-            # Unknown character
-            raise SyntaxError(f"Unexpected character '{self.current_char()}' at line {line}, column {column}")
-
-        # Add EOF token
-        self.tokens.append(Token(TokenType.EOF, None, self.line, self.column))
-        return self.tokens
+# Checked on every advance; a module global is much cheaper to load than
+# an enum member
+_EOF = TokenType.EOF
 
 
 class Parser:
     """Parser for the DSL."""
 
-    def __init__(self, tokens: List[Token]):
+    # Statement keyword -> name of the method that parses the statement
+    _STATEMENT_PARSERS = {
+        TokenType.LOAD_CSV: 'parse_load_statement',
+        TokenType.NORMALIZE: 'parse_normalize_statement',
+        TokenType.AGGREGATE: 'parse_aggregate_statement',
+        TokenType.UNIT_CONVERT: 'parse_unit_convert_statement',
+        TokenType.ENRICH: 'parse_enrich_statement',
+        TokenType.COMPUTE: 'parse_compute_statement',
+        TokenType.VALIDATE: 'parse_validate_statement',
+    }
+
+    def __init__(self, tokens: Union[Lexer, TokenArrays]):
         self.tokens = tokens
-        self.pos = 0
+        # Tokens are pulled from the source one at a time, as
+        # (type, value, position) rows; the source maps positions to lines
+        # and columns
+        self._next_row = tokens.stream().__next__
+        self._line_column = tokens.line_column
+        # Rows already read past the current token by peek_token/peek_type
+        self._ahead: List[Tuple[int, Any, int]] = []
+        # The current token; parse methods read type and value directly.
+        # They stay on EOF once reached.
+        self.type, self.value, self.position = self._next_row()
+        # Bound statement parsers, resolved once per parser
+        self._statement_parsers: Dict[TokenType, Callable[[], Statement]] = {
+            token_type: getattr(self, name) for token_type, name in self._STATEMENT_PARSERS.items()
+        }
 
     def current_token(self) -> Token:
         """Get the current token."""
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return self.tokens[-1]  # Return EOF
+        return Token(TokenType(self.type), self.value, *self._line_column(self.position))
 
     def peek_token(self, offset: int = 1) -> Token:
         """Peek at a token ahead."""
-        pos = self.pos + offset
-        if pos < len(self.tokens):
-            return self.tokens[pos]
-        return self.tokens[-1]  # Return EOF
+        token_type, value, position = self._peek_row(offset)
+        return Token(TokenType(token_type), value, *self._line_column(position))
+
+    def peek_type(self, offset: int = 1) -> int:
+        """Peek at the type of a token ahead."""
+        return self._peek_row(offset)[0]
+
+    def _peek_row(self, offset: int) -> Tuple[int, Any, int]:
+        """Return the row offset tokens ahead, reading up to it from the source."""
+        ahead = self._ahead
+        row = ahead[-1] if ahead else (self.type, self.value, self.position)
+        while len(ahead) < offset:
+            if row[0] == _EOF:
+                return row
+            row = self._next_row()
+            ahead.append(row)
+        return ahead[offset - 1]
 
     def advance(self):
         """Move to the next token."""
-        if self.pos < len(self.tokens) - 1:
-            self.pos += 1
+        if self.type != _EOF:
+            ahead = self._ahead
+            self.type, self.value, self.position = ahead.pop(0) if ahead else self._next_row()
+
+    def expect(self, token_type: TokenType) -> Any:
+        """Expect a specific token type, advance, and return the token's value."""
+        if self.type != token_type:
+            self._err_expect(token_type.name)
+        value = self.value
+        self.advance()
+        return value
 
-    def expect(self, token_type: TokenType) -> Token:
-        """Expect a specific token type and advance."""
+    # Error paths are kept out of line so the hot methods stay small.
+
+    def _err_expect(self, expected: str) -> NoReturn:
+        """Raise a SyntaxError for a current token that is not the expected kind."""
         token = self.current_token()
-        if token.type != token_type:
-            raise SyntaxError(
-                f"Expected {token_type.name} but got {token.type.name} "
-                f"at line {token.line}, column {token.column}"
-            )
-        self.advance()
-        return token
+        raise SyntaxError(
+            f"Expected {expected} but got {token.type.name} "
+            f"at line {token.line}, column {token.column}"
+        )
+
+    def _err_unexpected(self, context: str = "") -> NoReturn:
+        """Raise a SyntaxError for a current token that cannot start what is being parsed."""
+        token = self.current_token()
+        raise SyntaxError(
+            f"Unexpected token {token.type.name}{context} "
+            f"at line {token.line}, column {token.column}"
+        )
 
     def parse(self) -> Program:
         """Parse the token stream into an AST."""
-        statements = []
+        return Program(list(self.iter_statements()))
 
-        while self.current_token().type != TokenType.EOF:
+    def iter_statements(self) -> Iterator[Statement]:
+        """
+        Parse statements lazily, yielding each one as soon as it is complete.
+
+        Tokens are read from the source only as far as the statement being
+        parsed, so a consumer that handles statements one at a time never
+        holds the whole program.
+        """
+        while self.type != TokenType.EOF:
             stmt = self.parse_statement()
             if stmt:
-                statements.append(stmt)
-
-        return Program(statements)
+                yield stmt
 
     def parse_statement(self) -> Optional[Statement]:
         """Parse a single statement."""
-        token = self.current_token()
-
-        if token.type == TokenType.LOAD_CSV:
-            return self.parse_load_statement()
-        elif token.type == TokenType.NORMALIZE:
-            return self.parse_normalize_statement()
-        elif token.type == TokenType.AGGREGATE:
-            return self.parse_aggregate_statement()
-        elif token.type == TokenType.UNIT_CONVERT:
-            return self.parse_unit_convert_statement()
-        elif token.type == TokenType.ENRICH:
-            return self.parse_enrich_statement()
-        elif token.type == TokenType.COMPUTE:
-            return self.parse_compute_statement()
-        elif token.type == TokenType.VALIDATE:
-            return self.parse_validate_statement()
-        else:
-            raise SyntaxError(
-                f"Unexpected token {token.type.name} at line {token.line}, column {token.column}"
-            )
+        parse = self._statement_parsers.get(self.type)
+        if parse is None:
+            self._err_unexpected()
+        return parse()
 
     def parse_load_statement(self) -> LoadStatement:
         """Parse LOAD_CSV statement."""
         self.expect(TokenType.LOAD_CSV)
-        path = self.expect(TokenType.STRING).value
+        path = self.expect(TokenType.STRING)
         self.expect(TokenType.AS)
-        node_label = self.expect(TokenType.IDENTIFIER).value
+        node_label = self.expect(TokenType.IDENTIFIER)
 
         column_map = {}
-        if self.current_token().type == TokenType.MAP_COLUMNS:
+        if self.type == TokenType.MAP_COLUMNS:
             self.advance()
             self.expect(TokenType.LBRACE)
 
-            while self.current_token().type != TokenType.RBRACE:
-                src = self.expect(TokenType.IDENTIFIER).value
-                self.expect(TokenType.ARROW)
-                dst = self.expect(TokenType.IDENTIFIER).value
+            # Loop invariants in locals: enum members are slow to look up
+            expect, advance = self.expect, self.advance
+            IDENTIFIER, ARROW = TokenType.IDENTIFIER, TokenType.ARROW
+            COMMA, RBRACE = TokenType.COMMA, TokenType.RBRACE
+
+            while self.type != RBRACE:
+                src = expect(IDENTIFIER)
+                expect(ARROW)
+                dst = expect(IDENTIFIER)
                 column_map[src] = dst
 
-                if self.current_token().type == TokenType.COMMA:
-                    self.advance()
+                if self.type == COMMA:
+                    advance()
 
-            self.expect(TokenType.RBRACE)
+            expect(RBRACE)
 
-        return LoadStatement(path, node_label, column_map)
+        return LoadStatement(path, node_label, tuple(column_map.items()))
 
     def parse_normalize_statement(self) -> NormalizeStatement:
         """Parse NORMALIZE statement."""
         self.expect(TokenType.NORMALIZE)
-        node_label = self.expect(TokenType.IDENTIFIER).value
+        node_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.LBRACE)
 
         normalizations = {}
 
-        while self.current_token().type != TokenType.RBRACE:
-            prop_name = self.expect(TokenType.IDENTIFIER).value
-            self.expect(TokenType.COLON)
-            self.expect(TokenType.LBRACE)
+        # Loop invariants in locals, as in parse_load_statement
+        expect, advance = self.expect, self.advance
+        parse_value_literal = self.parse_value_literal
+        IDENTIFIER, COLON, LBRACE = TokenType.IDENTIFIER, TokenType.COLON, TokenType.LBRACE
+        COMMA, RBRACE = TokenType.COMMA, TokenType.RBRACE
+
+        while self.type != RBRACE:
+            prop_name = expect(IDENTIFIER)
+            expect(COLON)
+            expect(LBRACE)
 
             mappings = {}
-            while self.current_token().type != TokenType.RBRACE:
-                old_val = self.parse_value_literal()
-                self.expect(TokenType.COLON)
-                new_val = self.parse_value_literal()
+            while self.type != RBRACE:
+                old_val = parse_value_literal()
+                expect(COLON)
+                new_val = parse_value_literal()
                 mappings[old_val] = new_val
 
-                if self.current_token().type == TokenType.COMMA:
-                    self.advance()
+                if self.type == COMMA:
+                    advance()
 
-            self.expect(TokenType.RBRACE)
-            normalizations[prop_name] = mappings
+            expect(RBRACE)
+            normalizations[prop_name] = tuple(mappings.items())
 
-            if self.current_token().type == TokenType.COMMA:
-                self.advance()
+            if self.type == COMMA:
+                advance()
 
-        self.expect(TokenType.RBRACE)
-        return NormalizeStatement(node_label, normalizations)
+        expect(RBRACE)
+        return NormalizeStatement(node_label, tuple(normalizations.items()))
 
     def parse_aggregate_statement(self) -> AggregateStatement:
         """Parse AGGREGATE statement."""
         self.expect(TokenType.AGGREGATE)
-        source_label = self.expect(TokenType.IDENTIFIER).value
+        source_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.BY)
 
         # Parse group by list
         self.expect(TokenType.LBRACKET)
         group_by = []
-        while self.current_token().type != TokenType.RBRACKET:
-            group_by.append(self.expect(TokenType.IDENTIFIER).value)
-            if self.current_token().type == TokenType.COMMA:
+        while self.type != TokenType.RBRACKET:
+            group_by.append(self.expect(TokenType.IDENTIFIER))
+            if self.type == TokenType.COMMA:
                 self.advance()
         self.expect(TokenType.RBRACKET)
 
         self.expect(TokenType.INTO)
-        target_label = self.expect(TokenType.IDENTIFIER).value
+        target_label = self.expect(TokenType.IDENTIFIER)
 
         # Parse aggregation clauses
         aggregations = []
-        while self.current_token().type in [TokenType.AGG_SUM, TokenType.AGG_COUNT, TokenType.TAKE_FIRST]:
-            agg_type = self.current_token().type
+        while self.type in (TokenType.AGG_SUM, TokenType.AGG_COUNT, TokenType.TAKE_FIRST):
+            agg_type = self.type
             self.advance()
             self.expect(TokenType.LPAREN)
 
             field = None
-            if self.current_token().type == TokenType.IDENTIFIER:
-                field = self.expect(TokenType.IDENTIFIER).value
+            if self.type == TokenType.IDENTIFIER:
+                field = self.expect(TokenType.IDENTIFIER)
 
             self.expect(TokenType.RPAREN)
             self.expect(TokenType.AS)
-            alias = self.expect(TokenType.IDENTIFIER).value
+            alias = self.expect(TokenType.IDENTIFIER)
 
             if agg_type == TokenType.AGG_SUM:
                 func = 'sum'
@@ -483,109 +542,105 @@ class Parser:
 
         # Parse optional time window
         time_window = None
-        if self.current_token().type == TokenType.TIME_WINDOW:
+        if self.type == TokenType.TIME_WINDOW:
             self.advance()
-            mode = self.expect(TokenType.IDENTIFIER).value
+            mode = self.expect(TokenType.IDENTIFIER)
             self.expect(TokenType.FROM)
-            source_field = self.expect(TokenType.IDENTIFIER).value
+            source_field = self.expect(TokenType.IDENTIFIER)
             self.expect(TokenType.INTO)
-            target_field = self.expect(TokenType.IDENTIFIER).value
+            target_field = self.expect(TokenType.IDENTIFIER)
             time_window = TimeWindow(mode, source_field, target_field)
 
-        return AggregateStatement(source_label, group_by, target_label, aggregations, time_window)
+        return AggregateStatement(source_label, tuple(group_by), target_label, tuple(aggregations), time_window)
 
     def parse_unit_convert_statement(self) -> UnitConvertStatement:
         """Parse UNIT_CONVERT statement."""
         self.expect(TokenType.UNIT_CONVERT)
-        node_label = self.expect(TokenType.IDENTIFIER).value
+        node_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.DOT)
-        field = self.expect(TokenType.IDENTIFIER).value
+        field = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.FROM)
         from_unit = self.parse_value_literal()
         self.expect(TokenType.TO)
         to_unit = self.parse_value_literal()
         self.expect(TokenType.USING)
-        conversion_table = self.expect(TokenType.STRING).value
+        conversion_table = self.expect(TokenType.STRING)
 
         return UnitConvertStatement(node_label, field, from_unit, to_unit, conversion_table)
 
     def parse_enrich_statement(self) -> EnrichStatement:
         """Parse ENRICH statement."""
         self.expect(TokenType.ENRICH)
-        source_label = self.expect(TokenType.IDENTIFIER).value
+        source_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.WITH)
         factor_table = self.parse_value_literal()
         self.expect(TokenType.MATCH)
         self.expect(TokenType.ON)
-        match_key = self.expect(TokenType.IDENTIFIER).value
+        match_key = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.OUTPUT)
-        target_label = self.expect(TokenType.IDENTIFIER).value
+        target_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.AS)
         self.expect(TokenType.LBRACE)
 
         output_fields = {}
-        while self.current_token().type != TokenType.RBRACE:
-            field_name = self.expect(TokenType.IDENTIFIER).value
+        while self.type != TokenType.RBRACE:
+            field_name = self.expect(TokenType.IDENTIFIER)
             self.expect(TokenType.COLON)
             expr = self.parse_expression()
             output_fields[field_name] = expr
 
-            if self.current_token().type == TokenType.COMMA:
+            if self.type == TokenType.COMMA:
                 self.advance()
 
         self.expect(TokenType.RBRACE)
-        return EnrichStatement(source_label, factor_table, match_key, target_label, output_fields)
+        return EnrichStatement(source_label, factor_table, match_key, target_label, tuple(output_fields.items()))
 
     def parse_compute_statement(self) -> ComputeStatement:
         """Parse COMPUTE statement."""
         self.expect(TokenType.COMPUTE)
-        field_name = self.expect(TokenType.IDENTIFIER).value
+        field_name = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.FOR)
-        source_label = self.expect(TokenType.IDENTIFIER).value
+        source_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.GROUP)
         self.expect(TokenType.BY)
 
         group_by = []
-        if self.current_token().type == TokenType.LBRACKET:
+        if self.type == TokenType.LBRACKET:
             self.advance()
-            while self.current_token().type != TokenType.RBRACKET:
-                group_by.append(self.expect(TokenType.IDENTIFIER).value)
-                if self.current_token().type == TokenType.COMMA:
+            while self.type != TokenType.RBRACKET:
+                group_by.append(self.expect(TokenType.IDENTIFIER))
+                if self.type == TokenType.COMMA:
                     self.advance()
             self.expect(TokenType.RBRACKET)
         else:
-            group_by.append(self.expect(TokenType.IDENTIFIER).value)
+            group_by.append(self.expect(TokenType.IDENTIFIER))
 
         self.expect(TokenType.INTO)
-        target_label = self.expect(TokenType.IDENTIFIER).value
+        target_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.AS)
         expression = self.parse_expression()
 
-        return ComputeStatement(field_name, source_label, group_by, target_label, expression)
+        return ComputeStatement(field_name, source_label, tuple(group_by), target_label, expression)
 
     def parse_validate_statement(self) -> ValidateStatement:
         """Parse VALIDATE statement."""
         self.expect(TokenType.VALIDATE)
-        node_label = self.expect(TokenType.IDENTIFIER).value
+        node_label = self.expect(TokenType.IDENTIFIER)
         self.expect(TokenType.WITH)
-        rule_name = self.expect(TokenType.STRING).value
+        rule_name = self.expect(TokenType.STRING)
 
         return ValidateStatement(node_label, rule_name)
 
     def parse_value_literal(self) -> str:
         """Parse a value literal (identifier or string)."""
-        token = self.current_token()
-        if token.type == TokenType.IDENTIFIER:
+        value = self.value
+        if self.type == TokenType.IDENTIFIER:
             self.advance()
-            return token.value
-        elif token.type == TokenType.STRING:
+            return value
+        elif self.type == TokenType.STRING:
             self.advance()
-            return token.value
-        else:
-            raise SyntaxError(
-                f"Expected identifier or string but got {token.type.name} "
-                f"at line {token.line}, column {token.column}"
-            )
+            return value
+        self._err_expect("identifier or string")
 
     def parse_expression(self) -> Expression:
         """Parse an expression."""
@@ -595,8 +650,8 @@ class Parser:
         """Parse addition/subtraction expression."""
         left = self.parse_multiplicative_expression()
 
-        while self.current_token().type in [TokenType.PLUS, TokenType.MINUS]:
-            op = self.current_token().value
+        while self.type in (TokenType.PLUS, TokenType.MINUS):
+            op = self.value
             self.advance()
             right = self.parse_multiplicative_expression()
             left = BinaryOpExpr(left, op, right)
@@ -607,8 +662,8 @@ class Parser:
         """Parse multiplication/division expression."""
         left = self.parse_primary_expression()
 
-        while self.current_token().type in [TokenType.MULTIPLY, TokenType.DIVIDE]:
-            op = self.current_token().value
+        while self.type in (TokenType.MULTIPLY, TokenType.DIVIDE):
+            op = self.value
             self.advance()
             right = self.parse_primary_expression()
             left = BinaryOpExpr(left, op, right)
@@ -617,90 +672,73 @@ class Parser:
 
     def parse_primary_expression(self) -> Expression:
         """Parse primary expression."""
-        token = self.current_token()
+        token_type, value = self.type, self.value
 
         # Function call
-        if token.type == TokenType.IDENTIFIER and self.peek_token().type == TokenType.LPAREN:
-            func_name = token.value
+        if token_type == TokenType.IDENTIFIER and self.peek_type() == TokenType.LPAREN:
+            func_name = value
             self.advance()
             self.expect(TokenType.LPAREN)
-            arg = self.expect(TokenType.IDENTIFIER).value
+            arg = self.expect(TokenType.IDENTIFIER)
             self.expect(TokenType.RPAREN)
             return FunctionCallExpr(func_name, arg)
 
-        # Identifier with possible concatenation
-        if token.type == TokenType.IDENTIFIER:
-            # Check for dotted access first (e.g., activity.id)
-            id_val = token.value
-            self.advance()
-            if self.current_token().type == TokenType.DOT:
-                self.advance()
-                field = self.expect(TokenType.IDENTIFIER).value
-                id_val = f"{id_val}.{field}"
-
-            parts = [IdentifierExpr(id_val)]
-
-            # Check for concatenation
-            while self.current_token().type == TokenType.PLUS:
+        # Identifier or string literal, with possible concatenation
+        first = self._parse_concat_operand()
+        if first is not None:
+            parts = [first]
+            while self.type == TokenType.PLUS:
                 self.advance()
-                next_token = self.current_token()
-                if next_token.type == TokenType.IDENTIFIER:
-                    # Check for dotted access (e.g., activity.id)
-                    id_val = next_token.value
-                    self.advance()
-                    if self.current_token().type == TokenType.DOT:
-                        self.advance()
-                        field = self.expect(TokenType.IDENTIFIER).value
-                        parts.append(IdentifierExpr(f"{id_val}.{field}"))
-                    else:
-                        parts.append(IdentifierExpr(id_val))
-                elif next_token.type == TokenType.STRING:
-                    parts.append(StringExpr(next_token.value))
-                    self.advance()
+                operand = self._parse_concat_operand()
+                # Anything else after '+' is left for the caller
+                if operand is not None:
+                    parts.append(operand)
 
             if len(parts) == 1:
-                return parts[0]
-            return ConcatenationExpr(parts)
+                return first
+            return ConcatenationExpr(tuple(parts))
 
-        # String literal with possible concatenation
-        if token.type == TokenType.STRING:
-            parts = [StringExpr(token.value)]
+        # Number
+        if token_type == TokenType.NUMBER:
             self.advance()
+            return NumberExpr(value)
 
-            while self.current_token().type == TokenType.PLUS:
-                self.advance()
-                next_token = self.current_token()
-                if next_token.type == TokenType.IDENTIFIER:
-                    id_val = next_token.value
-                    self.advance()
-                    if self.current_token().type == TokenType.DOT:
-                        self.advance()
-                        field = self.expect(TokenType.IDENTIFIER).value
-                        parts.append(IdentifierExpr(f"{id_val}.{field}"))
-                    else:
-                        parts.append(IdentifierExpr(id_val))
-                elif next_token.type == TokenType.STRING:
-                    parts.append(StringExpr(next_token.value))
-                    self.advance()
+        self._err_unexpected(" in expression")
 
-            if len(parts) == 1:
-                return parts[0]
-            return ConcatenationExpr(parts)
+    def _parse_concat_operand(self) -> Optional[Expression]:
+        """
+        Parse one concatenation operand: an identifier with optional
+        dotted access (e.g., activity.id) or a string literal.
 
-        # Number
-        if token.type == TokenType.NUMBER:
+        Returns None, without consuming anything, for any other token.
+        """
+        token_type, value = self.type, self.value
+        if token_type == TokenType.IDENTIFIER:
             self.advance()
-            return NumberExpr(token.value)
+            if self.type == TokenType.DOT:
+                self.advance()
+                field = self.expect(TokenType.IDENTIFIER)
+                return mk_ident(f"{value}.{field}")
+            return mk_ident(value)
+        if token_type == TokenType.STRING:
+            self.advance()
+            return mk_string(value)
+        return None
 
-        raise SyntaxError(
-            f"Unexpected token {token.type.name} in expression "
-            f"at line {token.line}, column {token.column}"
-        )
+
+@lru_cache(maxsize=256)
+def _parse_statements(text: str) -> Tuple[Statement, ...]:
+    """Parse DSL text into statements, remembering recent results."""
+    parser = Parser(Lexer(text))
+    return tuple(parser.parse().statements)
 
 
 def parse_dsl(text: str) -> Program:
-    """Parse DSL text into an AST."""
-    lexer = Lexer(text)
-    tokens = lexer.tokenize()
-    parser = Parser(tokens)
-    return parser.parse()
+    """
+    Parse DSL text into an AST.
+
+    Results are cached by source text, so re-parsing unchanged text is a
+    dictionary lookup. Each call returns a new Program; its statements are
+    immutable and shared with earlier calls on the same text.
+    """
+    return Program(list(_parse_statements(text)))
@@ -0,0 +1,14 @@
+"""
+Tests for the Dynamic Ontology DSL compiler.
+
+Run from the repository root with: python -m unittest
+
+The compiler modules use flat imports, so src/ is put on the import path.
+"""
+
+import sys
+from pathlib import Path
+
+_SRC = str(Path(__file__).resolve().parent.parent / 'src')
+if _SRC not in sys.path:
+    sys.path.insert(0, _SRC)
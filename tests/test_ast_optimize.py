@@ -0,0 +1,43 @@
+"""Tests for ast_optimize.py."""
+
+import unittest
+
+from ast_nodes import BinaryOpExpr, ComputeStatement, IdentifierExpr, NumberExpr, Program
+from ast_optimize import canonicalize
+
+
+def _compute(expression):
+    return ComputeStatement('total', 'emission', ['scope'], 'report', expression)
+
+
+class CanonicalizeTest(unittest.TestCase):
+
+    def test_folds_numeric_constants(self):
+        expr = BinaryOpExpr(NumberExpr(2), '*', BinaryOpExpr(NumberExpr(3), '+', NumberExpr(4)))
+        program = canonicalize(Program([_compute(expr)]))
+        self.assertEqual(program.statements[0].expression, NumberExpr(14))
+
+    def test_keeps_int_and_float_apart(self):
+        expr = BinaryOpExpr(NumberExpr(1), '+', NumberExpr(1.0))
+        folded = canonicalize(Program([_compute(expr)])).statements[0].expression
+        self.assertIsInstance(folded.value, float)
+
+    def test_leaves_inexact_integer_division(self):
+        expr = BinaryOpExpr(NumberExpr(7), '/', NumberExpr(2))
+        program = canonicalize(Program([_compute(expr)]))
+        self.assertEqual(program.statements[0].expression, expr)
+
+    def test_leaves_division_by_zero(self):
+        expr = BinaryOpExpr(NumberExpr(1), '/', NumberExpr(0))
+        program = canonicalize(Program([_compute(expr)]))
+        self.assertEqual(program.statements[0].expression, expr)
+
+    def test_shares_identical_expressions(self):
+        first = BinaryOpExpr(IdentifierExpr('x'), '*', NumberExpr(2))
+        second = BinaryOpExpr(IdentifierExpr('x'), '*', NumberExpr(2))
+        program = canonicalize(Program([_compute(first), _compute(second)]))
+        self.assertIs(program.statements[0].expression, program.statements[1].expression)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for codegen.py."""
+
+import unittest
+from pathlib import Path
+
+from ast_nodes import BinaryOpExpr, IdentifierExpr, NumberExpr
+from codegen import CypherGenerator, generate_cypher
+from parser import Lexer, Parser, parse_dsl
+
+_SAMPLE = Path(__file__).resolve().parent.parent / 'examples' / 'sample.dsl'
+
+
+class ExpressionMemoTest(unittest.TestCase):
+    """Memoized expressions must never be reused for a different node."""
+
+    def test_generate_expression_with_fresh_nodes(self):
+        generator = CypherGenerator()
+        for i in range(50):
+            expr = BinaryOpExpr(IdentifierExpr(f"x{i}"), '+', NumberExpr(i))
+            self.assertEqual(generator.generate_expression(expr), f"(x{i} + {i})")
+
+    def test_generate_statement_from_statement_stream(self):
+        source = '\n'.join(
+            f'COMPUTE t{i} FOR e GROUP BY s INTO r AS x * {i}' for i in range(50)
+        )
+        generator = CypherGenerator()
+        for i, stmt in enumerate(Parser(Lexer(source)).iter_statements()):
+            generator.generate_statement(stmt)
+            self.assertIn(f"WITH e.s AS s, (x * {i}) AS t{i}\n", generator.out.getvalue())
+
+    def test_shared_subexpression_in_one_program(self):
+        generator = CypherGenerator()
+        shared = BinaryOpExpr(IdentifierExpr('x'), '*', NumberExpr(2))
+        expr = BinaryOpExpr(shared, '+', shared)
+        self.assertEqual(generator.generate_expression(expr), "((x * 2) + (x * 2))")
+
+
+class OptimizeTest(unittest.TestCase):
+
+    _SOURCE = 'COMPUTE t FOR e GROUP BY s INTO r AS 2 * 3 * x'
+
+    def test_constants_are_kept_by_default(self):
+        self.assertIn("((2 * 3) * x) AS t", generate_cypher(parse_dsl(self._SOURCE)))
+
+    def test_optimize_folds_constants(self):
+        self.assertIn("(6 * x) AS t", generate_cypher(parse_dsl(self._SOURCE), optimize=True))
+
+
+class ParallelTest(unittest.TestCase):
+    """Parallel rendering must produce the same script as sequential rendering."""
+
+    def assertSameAsSequential(self, source):
+        program = parse_dsl(source)
+        self.assertEqual(generate_cypher(program, workers=2), generate_cypher(program))
+
+    def test_sample(self):
+        self.assertSameAsSequential((_SAMPLE.read_text(encoding='utf-8') + '\n') * 4)
+
+    def test_deeply_nested_expression(self):
+        factors = ' * '.join(['x'] * 2000)
+        self.assertSameAsSequential(
+            _SAMPLE.read_text(encoding='utf-8')
+            + f'\nCOMPUTE t FOR e GROUP BY s INTO r AS {factors}\n'
+        )
+
+
+class NormalizeTest(unittest.TestCase):
+
+    def test_chained_mappings_apply_at_once(self):
+        program = parse_dsl('NORMALIZE m { fuel: {"a": "b", "b": "c"} }')
+        self.assertEqual(generate_cypher(program), (
+            "// NORMALIZE: m\n"
+            "MATCH (n:m)\n"
+            "WHERE n.fuel IN ['a', 'b']\n"
+            "SET n.fuel = CASE n.fuel\n"
+            "  WHEN 'a' THEN 'b'\n"
+            "  WHEN 'b' THEN 'c'\n"
+            "END;"
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
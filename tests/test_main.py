@@ -0,0 +1,123 @@
+"""Tests for main.py."""
+
+import contextlib
+import io
+import os
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+
+_SAMPLE = Path(__file__).resolve().parent.parent / 'examples' / 'sample.dsl'
+
+
+def _failing_generate(program, out, *args):
+    out.write('// partial output')
+    raise RuntimeError('generation failed')
+
+
+class OutputFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output = os.path.join(self.tmp.name, 'out.cypher')
+
+    def compile(self, **kwargs):
+        with contextlib.redirect_stderr(io.StringIO()):
+            main.compile_dsl_file(str(_SAMPLE), self.output, use_cache=False, **kwargs)
+
+    def test_writes_output(self):
+        self.compile()
+        self.assertIn('LOAD CSV WITH HEADERS', Path(self.output).read_text(encoding='utf-8'))
+        self.assertEqual(os.listdir(self.tmp.name), ['out.cypher'])
+
+    def test_failed_generation_keeps_existing_file(self):
+        Path(self.output).write_text('previous', encoding='utf-8')
+        with mock.patch.object(main, 'generate_cypher', _failing_generate):
+            with self.assertRaises(SystemExit):
+                self.compile()
+        self.assertEqual(Path(self.output).read_text(encoding='utf-8'), 'previous')
+        self.assertEqual(os.listdir(self.tmp.name), ['out.cypher'])
+
+    def test_failed_generation_creates_no_file(self):
+        with mock.patch.object(main, 'generate_cypher', _failing_generate):
+            with self.assertRaises(SystemExit):
+                self.compile()
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_symlinked_output_updates_the_target(self):
+        target = os.path.join(self.tmp.name, 'target.cypher')
+        Path(target).write_text('previous', encoding='utf-8')
+        os.symlink(target, self.output)
+        self.compile()
+        self.assertTrue(os.path.islink(self.output))
+        self.assertIn('LOAD CSV WITH HEADERS', Path(target).read_text(encoding='utf-8'))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['out.cypher', 'target.cypher'])
+
+    def test_existing_file_keeps_its_mode(self):
+        Path(self.output).write_text('previous', encoding='utf-8')
+        os.chmod(self.output, 0o600)
+        self.compile()
+        self.assertEqual(stat.S_IMODE(os.stat(self.output).st_mode), 0o600)
+        self.assertIn('LOAD CSV WITH HEADERS', Path(self.output).read_text(encoding='utf-8'))
+
+
+class OutputCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': os.path.join(self.tmp.name, 'cache')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = os.path.join(self.tmp.name, 'in.dsl')
+        Path(self.source).write_text(_SAMPLE.read_text(encoding='utf-8'), encoding='utf-8')
+
+    def compile(self, output_path=None):
+        stdout = io.StringIO()
+        with contextlib.redirect_stderr(io.StringIO()), contextlib.redirect_stdout(stdout):
+            main.compile_dsl_file(self.source, output_path)
+        return stdout.getvalue()
+
+    def entries(self):
+        cache_dir = main._cache_dir()
+        return sorted(cache_dir.glob('*.cypher')) if cache_dir.is_dir() else []
+
+    def test_output_file_is_cached_and_reused(self):
+        first = os.path.join(self.tmp.name, 'first.cypher')
+        self.compile(first)
+        self.assertEqual(len(self.entries()), 1)
+
+        second = os.path.join(self.tmp.name, 'second.cypher')
+        with mock.patch.object(main, 'parse_dsl', side_effect=AssertionError('cache not used')):
+            self.compile(second)
+            printed = self.compile()
+        expected = Path(first).read_text(encoding='utf-8')
+        self.assertEqual(Path(second).read_text(encoding='utf-8'), expected)
+        self.assertEqual(printed, expected + '\n')
+
+    def test_stdout_is_not_cached(self):
+        printed = self.compile()
+        self.assertIn('LOAD CSV WITH HEADERS', printed)
+        self.assertEqual(self.entries(), [])
+
+    def test_device_output_is_not_cached(self):
+        self.compile(os.devnull)
+        self.assertEqual(self.entries(), [])
+        self.assertFalse(os.path.isfile(os.devnull))
+
+    def test_cache_size_is_bounded(self):
+        output = os.path.join(self.tmp.name, 'out.cypher')
+        with mock.patch.object(main, '_CACHE_MAX_ENTRIES', 2):
+            for i in range(4):
+                Path(self.source).write_text(f'VALIDATE report{i} WITH "rule"', encoding='utf-8')
+                self.compile(output)
+        self.assertEqual(len(self.entries()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
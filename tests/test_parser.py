@@ -0,0 +1,57 @@
+"""Tests for parser.py."""
+
+import dataclasses
+import unittest
+
+from parser import Lexer, TokenType, parse_dsl
+
+_SOURCE = '''
+AGGREGATE measurement
+  BY [factory_id, product_id]
+  INTO activity
+  AGG_SUM(value) AS value
+ENRICH activity WITH emission_factor_table
+  MATCH ON fuel
+  OUTPUT emission AS { id: "em_" + activity.id }
+'''
+
+
+class ParseCacheTest(unittest.TestCase):
+    """Cached parse results are shared, so they must not be modifiable."""
+
+    def test_statements_are_immutable(self):
+        aggregate, enrich = parse_dsl(_SOURCE).statements
+        with self.assertRaises(AttributeError):
+            aggregate.group_by.append('zzz')
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            aggregate.target_label = 'other'
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            aggregate.aggregations[0].alias = 'other'
+        self.assertIsInstance(enrich.output_fields, tuple)
+
+    def test_repeated_parse_is_unchanged(self):
+        first = parse_dsl(_SOURCE)
+        first.statements.pop()
+        second = parse_dsl(_SOURCE)
+        self.assertEqual(len(second.statements), 2)
+        self.assertEqual(second.statements[0].group_by, ('factory_id', 'product_id'))
+
+
+class LexerTest(unittest.TestCase):
+
+    def test_unicode_words_and_digits(self):
+        tokens = [(token_type, value) for token_type, value, _ in Lexer('工場_1 área-2 ٣٤').stream()]
+        self.assertEqual(tokens, [
+            (TokenType.IDENTIFIER, '工場_1'),
+            (TokenType.IDENTIFIER, 'área-2'),
+            (TokenType.NUMBER, 34),
+            (TokenType.EOF, None),
+        ])
+
+    def test_unexpected_character(self):
+        with self.assertRaisesRegex(SyntaxError, "Unexpected character '@' at line 2, column 3"):
+            list(Lexer('a\n  @').stream())
+
+
+if __name__ == '__main__':
+    unittest.main()